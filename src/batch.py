@@ -0,0 +1,334 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from compiler.cache import VERSION
+from compiler.contracts import parse_mode
+from compiler.vm import MAX_DEPTH
+from interpreter.parallel import set_workers
+from py0 import ENGINES, run
+
+
+class Job:
+    """One program run against one stdin, writing one stdout file."""
+
+    def __init__(self, name, program, stdin, stdout):
+        self.name = name
+        self.program = program
+        self.stdin = stdin
+        self.stdout = stdout
+
+
+class Options:
+    """How every job in the batch runs; sent to each worker once."""
+
+    def __init__(self, engine="tree", optimize=0, max_depth=MAX_DEPTH, contracts="full",
+                 cache=True):
+        self.engine = engine
+        self.optimize = optimize
+        self.max_depth = max_depth
+        self.contracts = contracts
+        self.cache = cache
+
+
+def expand(patterns):
+    """The files named by each path or glob, in order, without repeats."""
+    files = []
+    for pattern in patterns:
+        matches = [pattern]
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        matches = [match for match in matches if os.path.isfile(match)]
+        if not matches:
+            raise FileNotFoundError(f"no files match '{pattern}'")
+        files.extend(match for match in matches if match not in files)
+    return files
+
+
+def stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def plan(programs, inputs, output):
+    """A job per program, or per program and input file when inputs is a directory."""
+    stdins = [None]
+    if inputs is not None:
+        stdins = sorted(entry.path for entry in os.scandir(inputs) if entry.is_file())
+        if not stdins:
+            raise FileNotFoundError(f"no input files in '{inputs}'")
+
+    jobs = []
+    names = {}
+    for program in programs:
+        for stdin in stdins:
+            name = stem(program) if stdin is None else f"{stem(program)}.{stem(stdin)}"
+            if name in names:
+                raise ValueError(f"{program} and {names[name]} would both write {name}.out")
+            names[name] = program
+            jobs.append(Job(name, program, stdin, os.path.join(output, f"{name}.out")))
+    return jobs
+
+
+def run_job(job, options):
+    """Runs one job in this process; returns its exit status, as py0.py would exit."""
+    status = 0
+    with open(job.stdin or os.devnull, "r") as stdin, open(job.stdout, "w") as stdout:
+        sys.stdin, sys.stdout = stdin, stdout
+        try:
+            with open(job.program, "r") as file:
+                source = file.read()
+            run(source, options.engine, options.optimize,
+                job.program if options.cache else None, options.max_depth,
+                contracts=options.contracts)
+        except Exception as e:
+            print(f"Error: {e}")
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stdin, sys.stdout = sys.__stdin__, sys.__stdout__
+    return status
+
+
+def serve(conn, options):
+    """A worker: runs the jobs it is sent until it is sent None."""
+    # The batch already keeps every CPU busy
+    set_workers(1)
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        start = time.perf_counter()
+        status = run_job(job, options)
+        conn.send((status, time.perf_counter() - start))
+
+
+class Worker:
+    """A warm process, with the one job it is running if any."""
+
+    def __init__(self, options):
+        self.conn, child = multiprocessing.Pipe()
+        # Not a daemon, so pmap can still start processes of its own
+        self.process = multiprocessing.Process(target=serve, args=(child, options))
+        self.process.start()
+        child.close()
+        self.job = None
+        self.started = 0.0
+
+    def start(self, job):
+        self.job = job
+        self.started = time.perf_counter()
+        self.conn.send(job)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def result(job, status, seconds, exit_code):
+    return {
+        "name": job.name,
+        "program": job.program,
+        "stdin": job.stdin,
+        "stdout": job.stdout,
+        "status": status,
+        "exit": exit_code,
+        "seconds": seconds,
+    }
+
+
+def run_batch(jobs, options, workers, timeout=None):
+    """
+    Runs the jobs on a pool of warm worker processes, returning a result
+    per job in the order given. A job that kills its worker or runs past
+    the timeout is reported as crashed or timeout, and the worker is
+    replaced, so the other jobs carry on.
+    """
+    pending = deque(jobs)
+    results = {}
+    pool = [Worker(options) for _ in range(min(workers, len(jobs)))]
+    try:
+        for worker in pool:
+            if pending:
+                worker.start(pending.popleft())
+
+        while any(worker.job is not None for worker in pool):
+            busy = [worker for worker in pool if worker.job is not None]
+            deadline = None
+            if timeout is not None:
+                deadline = max(0.0, min(w.started for w in busy) + timeout - time.perf_counter())
+            ready = wait([w.conn for w in busy] + [w.process.sentinel for w in busy], deadline)
+
+            for i, worker in enumerate(pool):
+                job = worker.job
+                if job is None:
+                    continue
+                elapsed = time.perf_counter() - worker.started
+                if worker.conn in ready or worker.process.sentinel in ready:
+                    try:
+                        status, seconds = worker.conn.recv()
+                    except (EOFError, OSError):
+                        worker.process.join()
+                        results[id(job)] = result(job, "crashed", elapsed, worker.process.exitcode)
+                    else:
+                        results[id(job)] = result(job, "ok" if status == 0 else "error",
+                                                  seconds, status)
+                        if worker.process.is_alive():
+                            worker.job = None
+                elif timeout is not None and elapsed >= timeout:
+                    results[id(job)] = result(job, "timeout", elapsed, None)
+                else:
+                    continue
+
+                if worker.job is not None:
+                    # Crashed, timed out or exiting: the process can't take another job
+                    worker.kill()
+                    worker = pool[i] = Worker(options)
+                if pending:
+                    worker.start(pending.popleft())
+    finally:
+        for worker in pool:
+            worker.stop()
+    return [results[id(job)] for job in jobs]
+
+
+def summary(results, elapsed, out=sys.stderr):
+    for entry in results:
+        code = "" if entry["exit"] is None else entry["exit"]
+        out.write(f"{entry['status']:<8} {code:>4} {entry['seconds']:9.3f}s  {entry['name']}\n")
+    counts = {}
+    for entry in results:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    tally = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    out.write(f"{len(results)} jobs: {tally} in {elapsed:.3f}s\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="py0 batch",
+        description="Runs many py0 programs, or one program over many inputs, on a pool "
+                    "of warm worker processes"
+    )
+
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="Programs to run: paths or glob patterns such as 'jobs/**/*.py0'"
+    )
+
+    parser.add_argument(
+        "--inputs",
+        metavar="DIR",
+        help="Run every program once per file in DIR, with that file as its stdin "
+             "(default: each program runs once, with empty stdin)"
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        metavar="DIR",
+        default="py0-batch",
+        help="Directory for each job's stdout, as NAME.out (default: py0-batch)"
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: one per CPU)"
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds a job may run before its worker is killed and replaced"
+    )
+
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="Also write the results, with exit codes and timings, to PATH as JSON"
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="tree",
+        help="Execution engine (default: tree)"
+    )
+
+    parser.add_argument(
+        "-O", "--optimize",
+        type=int,
+        choices=[0, 1],
+        default=0,
+        help="Optimization level (default: 0)"
+    )
+
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=MAX_DEPTH,
+        help=f"Maximum call depth for the vm engine (default: {MAX_DEPTH})"
+    )
+
+    parser.add_argument(
+        "--contracts",
+        metavar="MODE",
+        default="full",
+        help="off, requires, full or sample:N, as for a single run (default: full)"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Don't read or write the __py0cache__ entries of the programs"
+    )
+
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    try:
+        parse_mode(args.contracts)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        jobs = plan(expand(args.files), args.inputs, args.output)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    os.makedirs(args.output, exist_ok=True)
+
+    options = Options(args.engine, args.optimize, args.max_depth, args.contracts, args.cache)
+    start = time.perf_counter()
+    results = run_batch(jobs, options, args.jobs, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    summary(results, elapsed)
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump({"py0": VERSION, "engine": args.engine, "jobs": args.jobs,
+                       "seconds": elapsed, "results": results}, file, indent=2)
+            file.write("\n")
+    return 0 if all(entry["status"] == "ok" for entry in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from parser.parser import Parser
+from parser.resolver import Resolver
+
+from compiler.cache import VERSION
+from compiler.inference import TypeInference
+from lexer.lexer import Lexer
+from py0 import ENGINES, executor
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+# A run is slower than its baseline when its median grows by more than this
+THRESHOLD = 0.10
+
+
+def letters(n):
+    # py0 identifiers can't hold digits
+    name = ""
+    while True:
+        name = chr(ord("a") + n % 26) + name
+        n //= 26
+        if n == 0:
+            return name
+
+
+def generated_source(functions=2000):
+    """A large, deterministic program: mostly front-end work, little to execute."""
+    lines = []
+    for i in range(functions):
+        lines.append(f"def fn_{letters(i)}(a, b) {{")
+        lines.append(f"  x = a * {i} + b;")
+        lines.append(f"  if x > {i * 3} {{")
+        lines.append(f"    return x - {i};")
+        lines.append("  }")
+        lines.append(f"  y = [x, \"f{i}\", {i}];")
+        lines.append("  return y[0];")
+        lines.append("}")
+    lines.append("total = 0;")
+    for i in range(0, functions, 10):
+        lines.append(f"total += fn_{letters(i)}({i}, 1);")
+    lines.append("print(total);")
+    return "\n".join(lines) + "\n"
+
+
+def programs():
+    """Every benchmark as name -> source, the generated one included."""
+    sources = {}
+    for entry in sorted(os.listdir(BENCHMARKS)):
+        if entry.endswith(".py0"):
+            with open(os.path.join(BENCHMARKS, entry)) as file:
+                sources[entry[:-len(".py0")]] = file.read()
+    sources["generated"] = generated_source()
+    return sources
+
+
+def measure(work, warmup, repeat):
+    """Runs work() warmup + repeat times; returns the timed seconds."""
+    times = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def summarize(times):
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "runs": len(times),
+    }
+
+
+def bench_program(source, engines, warmup, repeat):
+    """Times lexing, parsing and execution on each engine separately."""
+    tokens = Lexer(source).scan()
+    results = {
+        "lex": summarize(measure(lambda: Lexer(source).scan(), warmup, repeat)),
+        "parse": summarize(measure(lambda: Parser(tokens).parse(), warmup, repeat)),
+    }
+
+    for engine in engines:
+        # Execution starts from a resolved tree, fresh for every run since
+        # engines cache things on the nodes
+        def execute():
+            statements = Parser(tokens).parse()
+            slots = Resolver().resolve(statements)
+            TypeInference().infer(statements)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                executor(engine)(statements, slots)
+            return time.perf_counter() - start
+
+        times = [execute() for _ in range(warmup + repeat)][warmup:]
+        results[f"exec.{engine}"] = summarize(times)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lists every timing whose median regressed past the threshold."""
+    regressions = []
+    for name, phases in results["benchmarks"].items():
+        for phase, stats in phases.items():
+            before = baseline.get("benchmarks", {}).get(name, {}).get(phase)
+            if before is None:
+                continue
+            ratio = stats["median"] / before["median"]
+            if ratio > 1 + threshold:
+                regressions.append((name, phase, before["median"], stats["median"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times the py0 lexer, parser and engines on the benchmark programs"
+    )
+
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="Benchmarks to run (default: all of them)"
+    )
+
+    parser.add_argument(
+        "--engine",
+        dest="engines",
+        action="append",
+        choices=ENGINES,
+        help="Engine to execute on; repeat for several (default: every engine)"
+    )
+
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Untimed runs before measuring (default: 1)"
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Timed runs per phase (default: 5)"
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the JSON results to this file instead of stdout"
+    )
+
+    parser.add_argument(
+        "--baseline",
+        help="JSON results of an earlier run to compare against; exits with status 1 "
+             "on a regression"
+    )
+
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help=f"Allowed slowdown of a median over the baseline (default: {THRESHOLD})"
+    )
+
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    sources = programs()
+    names = args.names or list(sources)
+    for name in names:
+        if name not in sources:
+            parser.error(f"unknown benchmark {name}; choose from {', '.join(sources)}")
+
+    results = {
+        "py0": VERSION,
+        "python": platform.python_version(),
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "benchmarks": {},
+    }
+    for name in names:
+        print(f"{name}...", file=sys.stderr)
+        results["benchmarks"][name] = bench_program(
+            sources[name], args.engines or ENGINES, args.warmup, args.repeat)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, phase, before, after, ratio in regressions:
+            print(f"REGRESSION {name} {phase}: {before:.4f}s -> {after:.4f}s ({ratio:.2f}x)",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
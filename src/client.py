@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+
+# Only the standard library, so a client starts as fast as Python does.
+# A request is a length-prefixed JSON header sent together with the
+# client's stdin, stdout and stderr file descriptors; the reply is the
+# script's exit status, the same way.
+
+HEADER = struct.Struct("!I")
+MAX_REQUEST = 1 << 16
+
+
+def send_message(sock, message, fds=()):
+    data = json.dumps(message).encode("utf-8")
+    if len(data) > MAX_REQUEST:
+        raise ValueError("request too large")
+    socket.send_fds(sock, [HEADER.pack(len(data)) + data], list(fds))
+
+
+def receive_message(sock, maxfds=0):
+    """(message, fds), or (None, []) if the peer closed the connection first."""
+    data, fds, _, _ = socket.recv_fds(sock, HEADER.size + MAX_REQUEST, maxfds)
+    if len(data) < HEADER.size:
+        return None, fds
+    size = HEADER.unpack_from(data)[0]
+    data = data[HEADER.size:]
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None, fds
+        data += chunk
+    return json.loads(data[:size]), fds
+
+
+def request(path, file, optimize=0, contracts="full", cache=True):
+    """Runs file on the server at path with this process's stdio; returns its exit status."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError as e:
+            raise ConnectionError(f"no py0 server at {path}: {e.strerror or e}")
+        send_message(sock, {
+            "file": os.path.abspath(file),
+            "cwd": os.getcwd(),
+            "optimize": optimize,
+            "contracts": contracts,
+            "cache": cache,
+        }, [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()])
+        reply, _ = receive_message(sock)
+    if reply is None:
+        raise ConnectionError("the server closed the connection without an exit status")
+    return reply["exit"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="py0 client",
+        description="Runs a py0 program on a running 'py0 serve', with this terminal's "
+                    "stdin and stdout"
+    )
+
+    parser.add_argument(
+        "file",
+        help="Path to the .py0 file to execute"
+    )
+
+    parser.add_argument(
+        "--socket",
+        required=True,
+        metavar="PATH",
+        help="Unix socket the server listens on"
+    )
+
+    parser.add_argument(
+        "-O", "--optimize",
+        type=int,
+        choices=[0, 1],
+        default=0,
+        help="Optimization level (default: 0)"
+    )
+
+    parser.add_argument(
+        "--contracts",
+        metavar="MODE",
+        default="full",
+        help="off, requires, full or sample:N (default: full)"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Don't read or write the __py0cache__ entry for the file"
+    )
+
+    args = parser.parse_args(argv)
+    # Anything still buffered belongs before the script's output
+    sys.stdout.flush()
+    try:
+        return request(args.socket, args.file, args.optimize, args.contracts, args.cache)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
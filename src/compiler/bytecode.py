@@ -0,0 +1,128 @@
+from typing import Dict, List
+
+# Every instruction is two slots wide: an opcode followed by its operand.
+# Opcodes are plain ints so the VM dispatch loop compares small integers.
+
+CONST = 0           # push consts[arg]
+POP = 1             # discard top of stack
+DUP = 2             # duplicate top of stack
+LOAD_LOCAL = 3      # push locals[arg]
+STORE_LOCAL = 4     # pop into locals[arg]
+LOAD_GLOBAL = 5     # push globals[consts[arg]]
+STORE_GLOBAL = 6    # pop into an existing global consts[arg]
+DEFINE_GLOBAL = 7   # pop into global consts[arg], defining it if needed
+LOAD_OUTER = 8      # push an enclosing frame's slot, consts[arg] = (depth, slot)
+STORE_OUTER = 9     # pop into an enclosing frame's slot
+
+ADD = 10
+SUB = 11
+MUL = 12
+DIV = 13
+MOD = 14
+BAND = 15
+BOR = 16
+BXOR = 17
+GREATER = 18
+GREATER_EQUAL = 19
+LESS = 20
+LESS_EQUAL = 21
+EQUAL = 22
+NOT_EQUAL = 23      # binary operators, consts[arg] is the operator token
+
+NOT = 24
+NEGATE = 25
+TO_BOOL = 26
+INPLACE_ADD = 27    # pop current, value; push current + value
+INPLACE_SUB = 28    # pop current, value; push current - value
+
+JUMP = 29                   # pc = arg
+POP_JUMP_IF_FALSE = 30      # pop, jump to arg if falsy
+POP_JUMP_IF_TRUE = 31       # pop, jump to arg if truthy
+
+BUILD_ARRAY = 32    # pop arg elements into a new array
+INDEX = 33          # pop index, array; push array[index]
+STORE_INDEX = 34    # pop index, array, value; consts[arg] is the operator type
+
+GET_ITER = 35       # replace top of stack with an iterator over it
+FOR_ITER = 36       # store the next item or pop the iterator and jump to arg;
+                    # always followed by the STORE_LOCAL naming the loop
+                    # variable, whose dispatch it performs itself
+
+CALL = 37           # call with arg arguments
+RETURN = 38         # return top of stack
+FUNCTION = 39       # push a function for the code object consts[arg]
+CONST_ARRAY = 40    # push a fresh copy of the ConstantArray consts[arg]
+TAIL_CALL = 41      # CALL that replaces the current frame; a RETURN follows it
+
+NAMES = {value: name for name, value in list(globals().items())
+         if name.isupper() and isinstance(value, int)}
+
+
+class CodeObject:
+    def __init__(self, name: str, arity: int = 0, function=None):
+        self.name = name
+        self.arity = arity
+        # The Function this was compiled from, if any
+        self.function = function
+        self.code: List[int] = []
+        self.consts: List[object] = []
+        # Index of each constant in consts; see key()
+        self.indices: Dict[object, int] = {}
+        self.lines: List[int] = []
+        self.nlocals = arity
+
+    def emit(self, op: int, arg: int, line: int) -> int:
+        self.code.append(op)
+        self.code.append(arg)
+        self.lines.append(line)
+        return len(self.code) - 2
+
+    def patch(self, at: int, target: int):
+        self.code[at + 1] = target
+
+    @staticmethod
+    def key(value: object) -> object:
+        # Equal scalars share an entry, but not across types, so True and 1
+        # get separate ones, nor across signs, so 0.0 and -0.0 do too.
+        # Tuples, like the (depth, slot) of an outer variable, share by
+        # value; anything else is only ever itself
+        if isinstance(value, float):
+            return float, repr(value)
+        if isinstance(value, (str, int)):
+            return type(value), value
+        if isinstance(value, tuple):
+            return tuple, tuple(CodeObject.key(item) for item in value)
+        return id(value)
+
+    def constant(self, value: object) -> int:
+        key = self.key(value)
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    def line_at(self, pc: int) -> int:
+        return self.lines[pc // 2]
+
+
+def disassemble(code: CodeObject, indent: int = 0) -> str:
+    pad = " " * indent
+    out = [f"{pad}<code {code.name} arity={code.arity} locals={code.nlocals}>"]
+    nested = []
+    for pc in range(0, len(code.code), 2):
+        op, arg = code.code[pc], code.code[pc + 1]
+        detail = ""
+        if op in (CONST, CONST_ARRAY, LOAD_GLOBAL, STORE_GLOBAL, DEFINE_GLOBAL, LOAD_OUTER,
+                  STORE_OUTER, FUNCTION, STORE_INDEX) or ADD <= op <= NOT_EQUAL:
+            const = code.consts[arg]
+            if isinstance(const, CodeObject):
+                nested.append(const)
+                detail = f"<code {const.name}>"
+            else:
+                detail = repr(getattr(const, "lexeme", getattr(const, "values", const)))
+        out.append(f"{pad}{pc:5} {code.line_at(pc):4}  "
+                   f"{NAMES[op]:<18}{arg:<5}{detail}")
+    for inner in nested:
+        out.append(disassemble(inner, indent + 2))
+    return "\n".join(out)
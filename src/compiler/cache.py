@@ -0,0 +1,74 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from parser.grammar.statements import Statement
+from typing import List, Optional, Tuple
+
+VERSION = "0.1.0"
+
+# Bump whenever the AST classes or the resolver's annotations change shape,
+# so caches written by an older front end are never unpickled
+FORMAT = 8
+
+CACHE_DIR = "__py0cache__"
+MAGIC = f"py0-{VERSION}-{FORMAT}-{sys.implementation.cache_tag}"
+
+
+class ProgramCache:
+    """
+    Caches the front end's output (the parsed, optimized and resolved AST
+    plus the script frame size) next to the source file, like __pycache__.
+
+    Entries are keyed by a hash of the source text and stamped with the
+    interpreter version, so an edited file or a new interpreter simply
+    misses. Writes go to a temporary file that is renamed into place, so
+    concurrent runs only ever see a complete entry. A cache that cannot be
+    read or written is ignored.
+    """
+
+    def __init__(self, path: str, optimize: int = 0, contracts: str = "full",
+                 context: str = ""):
+        directory, name = os.path.split(os.path.abspath(path))
+        name = os.path.splitext(name)[0]
+        self.directory = os.path.join(directory, CACHE_DIR)
+        suffix = f".opt-{optimize}" if optimize else ""
+        # Contracts are lowered into the cached tree, so each mode has its own entry
+        if contracts != "full":
+            suffix += f".contracts-{contracts.replace(':', '-')}"
+        # So is a program resolved after others, per what they declared
+        if context:
+            suffix += f".after-{self.key(context)[:12]}"
+        self.path = os.path.join(self.directory, f"{name}.py0-{VERSION}{suffix}.pickle")
+
+    @staticmethod
+    def key(source: str) -> str:
+        return hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def load(self, source: str) -> Optional[Tuple[List[Statement], int]]:
+        try:
+            with open(self.path, "rb") as file:
+                magic, key, statements, slots = pickle.load(file)
+        except Exception:
+            return None
+        if magic != MAGIC or key != self.key(source):
+            return None
+        return statements, slots
+
+    def store(self, source: str, statements: List[Statement], slots: int):
+        entry = (MAGIC, self.key(source), statements, slots)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(entry, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.path)
+        except Exception:
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
@@ -0,0 +1,524 @@
+import operator
+from parser.environment import Environment
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.functions import Callable
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import Dict, List, Optional
+
+from interpreter.arrays import get_item, set_item
+from interpreter.console import Console
+from interpreter.natives import define_natives
+from interpreter.typecheck import checkzero, typecheck
+from lexer.tokens import Token, TokenType
+from util.errors import error
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+# Binary operators with nothing left to check once TypeInference has proven
+# their operand types; / and % still need their divisor checked
+SAFE_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.AMPERSAND: operator.and_,
+    TokenType.PIPE: operator.or_,
+    TokenType.XOR: operator.xor,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne,
+}
+
+# Frames are plain lists: parameters and locals at their Resolver slots,
+# followed by the frame the function was declared in. Statement closures
+# return None to fall through, or a 1-tuple holding the returned value.
+
+
+class ClosureFunction(Callable):
+    def __init__(self, function: Function, body, closure: list):
+        self.function = function
+        self.body = body
+        self.closure = closure
+        self.nparams = len(function.parameters)
+        self.padding = [None] * (function.slots - self.nparams)
+
+    def call(self, interpreter, args):
+        frame = list(args) + self.padding
+        frame.append(self.closure)
+        result = self.body(frame)
+        return None if result is None else result[0]
+
+    def arity(self):
+        return self.nparams
+
+
+class ClosureCompiler(ExpressionVisitor, StatementVisitor):
+    """
+    Compiles a resolved AST into nested Python closures.
+
+    Every node is translated once into a function of the current frame,
+    so execution never goes back through accept() or the per-operator
+    dispatch in visit_binary.
+    """
+
+    engine = "closure"
+
+    def __init__(self):
+        self.env = Environment()
+        define_natives(self.env)
+        self.console = Console()
+        # Evaluations so far of each sampled contract check; see compiler.contracts
+        self.samples: Dict[object, int] = {}
+        self.globals = self.env.values
+        # Frame index of the enclosing-frame link, innermost function last
+        self.links: List[int] = []
+
+    def run(self, statements: List[Statement], slots: int = 0) -> object:
+        program = self.compile(statements, slots)
+        frame = [None] * slots
+        frame.append(None)
+        try:
+            return program(frame)
+        finally:
+            self.console.flush()
+
+    def lookup_global(self, name: str) -> object:
+        return self.globals[name]
+
+    def compile(self, statements: List[Statement], slots: int = 0):
+        self.links = [slots]
+        return self.sequence(statements)
+
+    def sequence(self, statements: List[Optional[Statement]]):
+        compiled = [self.exec(statement) for statement in statements if statement is not None]
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(f):
+            for statement in compiled:
+                result = statement(f)
+                if result is not None:
+                    return result
+        return sequence
+
+    # Variable access at Resolver coordinates
+
+    def path(self, depth: int) -> List[int]:
+        return [self.links[-1 - i] for i in range(depth)]
+
+    def load(self, name: Token, depth: Optional[int], slot: Optional[int]):
+        if depth == 0:
+            return lambda f: f[slot]
+
+        if depth is None:
+            globals = self.globals
+            lexeme = name.lexeme
+
+            def load_global(f):
+                try:
+                    return globals[lexeme]
+                except KeyError:
+                    raise RuntimeError(f"Variable {lexeme} not defined")
+            return load_global
+
+        path = self.path(depth)
+        if depth == 1:
+            link = path[0]
+            return lambda f: f[link][slot]
+
+        def load_outer(f):
+            for link in path:
+                f = f[link]
+            return f[slot]
+        return load_outer
+
+    def store(self, name: Token, depth: Optional[int], slot: Optional[int], define: bool = False):
+        """Returns a function (frame, value) that stores value."""
+        if depth == 0:
+            def store_local(f, value):
+                f[slot] = value
+            return store_local
+
+        if depth is None:
+            globals = self.globals
+            lexeme = name.lexeme
+
+            def store_global(f, value):
+                if not define and lexeme not in globals:
+                    raise RuntimeError(f"Variable {lexeme} not defined")
+                globals[lexeme] = value
+            return store_global
+
+        path = self.path(depth)
+
+        def store_outer(f, value):
+            for link in path:
+                f = f[link]
+            f[slot] = value
+        return store_outer
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal):
+        value = literal.value
+        return lambda f: value
+
+    def visit_grouping(self, grouping: Grouping):
+        return self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary):
+        right = self.eval(unary.right)
+        if unary.op.type == TokenType.BANG:
+            return lambda f: not right(f)
+        if unary.op.type == TokenType.MINUS:
+            return lambda f: -1 * right(f)
+
+        def unknown_unary(f):
+            right(f)
+        return unknown_unary
+
+    def visit_array(self, array: Array):
+        elements = [self.eval(element) for element in array.elements]
+        return lambda f: [element(f) for element in elements]
+
+    def visit_constant_array(self, constant_array: ConstantArray):
+        build = constant_array.build
+        return lambda f: build()
+
+    def visit_array_access(self, array_access: ArrayAccess):
+        array_fn = self.eval(array_access.array)
+        index_fn = self.eval(array_access.index)
+        line = array_access.bracket.line
+
+        if array_access.safe:
+            def safe_access(f):
+                array = array_fn(f)
+                index = index_fn(f)
+                if 0 <= index < len(array):
+                    return array[index]
+                return get_item(array, index, line)
+            return safe_access
+
+        def access(f):
+            array = array_fn(f)
+            index = index_fn(f)
+            if type(array) is list and type(index) is int and 0 <= index < len(array):
+                return array[index]
+            return get_item(array, index, line)
+        return access
+
+    def visit_call(self, call: Call):
+        callee_fn = self.eval(call.callee)
+        arg_fns = [self.eval(arg) for arg in call.args]
+        argc = len(arg_fns)
+        line = call.paren.line
+        runtime = self
+
+        def invoke(f):
+            callee = callee_fn(f)
+            args = [arg(f) for arg in arg_fns]
+            if type(callee) is ClosureFunction:
+                if argc != callee.nparams:
+                    error(line, f"Expected {callee.nparams} arguments but received {argc}.")
+                args += callee.padding
+                args.append(callee.closure)
+                result = callee.body(args)
+                return None if result is None else result[0]
+            if not isinstance(callee, Callable):
+                error(line, "Can only invoke functions or classes")
+            if argc != callee.arity():
+                error(line, f"Expected {callee.arity()} arguments but received {argc}.")
+            return callee.call(runtime, args)
+        return invoke
+
+    def visit_binary(self, binary: Binary):
+        op = binary.op
+        left = self.eval(binary.left)
+        right = self.eval(binary.right)
+        kind = op.type
+
+        # Operand types proven by TypeInference need no checks at all
+        if binary.safe and kind in SAFE_OPERATORS:
+            fn = SAFE_OPERATORS[kind]
+            return lambda f: fn(left(f), right(f))
+
+        # int operands always pass typecheck, so only other values pay for it
+        if kind == TokenType.PLUS:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a + b
+        elif kind == TokenType.MINUS:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a - b
+        elif kind == TokenType.STAR:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a * b
+        elif kind == TokenType.SLASH:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                checkzero(op, b)
+                return a / b
+        elif kind == TokenType.MOD:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                checkzero(op, b)
+                return a % b
+        elif kind == TokenType.AMPERSAND:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                return a & b
+        elif kind == TokenType.PIPE:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                return a | b
+        elif kind == TokenType.XOR:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                return a ^ b
+        elif kind == TokenType.GREATER:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a > b
+        elif kind == TokenType.GREATER_EQUAL:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a >= b
+        elif kind == TokenType.LESS:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a < b
+        elif kind == TokenType.LESS_EQUAL:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                if type(a) is not int or type(b) is not int:
+                    typecheck(op, a, b)
+                return a <= b
+        elif kind == TokenType.EQUAL_EQUAL:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                return a == b
+        elif kind == TokenType.BANG_EQUAL:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+                return a != b
+        else:
+            def binary(f):
+                a = left(f)
+                b = right(f)
+                typecheck(op, a, b)
+        return binary
+
+    def visit_logical(self, logical: Logical):
+        left = self.eval(logical.left)
+        right = self.eval(logical.right)
+        if logical.op.type == TokenType.OR:
+            return lambda f: True if left(f) else bool(right(f))
+        if logical.op.type == TokenType.AND:
+            return lambda f: bool(right(f)) if left(f) else False
+
+        def unknown_logical(f):
+            left(f)
+            return bool(right(f))
+        return unknown_logical
+
+    def visit_assignment(self, assignment: Assignment):
+        value_fn = self.eval(assignment.value)
+        operator = assignment.operator
+
+        if isinstance(assignment.target, ArrayAccess):
+            array_fn = self.eval(assignment.target.array)
+            index_fn = self.eval(assignment.target.index)
+            line = assignment.target.bracket.line
+
+            def assign_index(f):
+                value = value_fn(f)
+                return set_item(array_fn(f), index_fn(f), value, operator, line)
+            return assign_index
+
+        target = assignment.target
+        if assignment.depth == 0:
+            slot = assignment.slot
+            if operator == TokenType.PLUS_EQUAL:
+                def assign_local(f):
+                    value = value_fn(f)
+                    value = f[slot] + value
+                    f[slot] = value
+                    return value
+            elif operator == TokenType.MINUS_EQUAL:
+                def assign_local(f):
+                    value = value_fn(f)
+                    value = f[slot] - value
+                    f[slot] = value
+                    return value
+            else:
+                def assign_local(f):
+                    value = value_fn(f)
+                    f[slot] = value
+                    return value
+            return assign_local
+
+        load = self.load(target, assignment.depth, assignment.slot)
+        store = self.store(target, assignment.depth, assignment.slot)
+
+        def assign(f):
+            value = value_fn(f)
+            if operator == TokenType.PLUS_EQUAL:
+                value = load(f) + value
+            elif operator == TokenType.MINUS_EQUAL:
+                value = load(f) - value
+            store(f, value)
+            return value
+        return assign
+
+    def visit_variable(self, variable: Variable):
+        return self.load(variable.name, variable.depth, variable.slot)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        expr = self.eval(expression_stmt.expr)
+
+        def expression_statement(f):
+            expr(f)
+        return expression_statement
+
+    def visit_var(self, var: Var):
+        initializer = (self.eval(var.initializer) if var.initializer is not None
+                       else lambda f: None)
+        if var.depth == 0:
+            slot = var.slot
+
+            def var_local(f):
+                f[slot] = initializer(f)
+            return var_local
+
+        store = self.store(var.name, var.depth, var.slot, define=True)
+
+        def var_statement(f):
+            store(f, initializer(f))
+        return var_statement
+
+    def visit_block(self, block: Block, new_env=None):
+        return self.sequence(block.statements)
+
+    def visit_function(self, function: Function):
+        self.links.append(function.slots)
+        body = self.sequence(function.body.statements)
+        self.links.pop()
+        store = self.store(function.name, function.depth, function.slot, define=True)
+
+        def function_statement(f):
+            store(f, ClosureFunction(function, body, f))
+        return function_statement
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        condition = self.eval(if_stmt.condition)
+        then_stmt = self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is None:
+            def if_statement(f):
+                if condition(f):
+                    return then_stmt(f)
+            return if_statement
+
+        else_stmt = self.exec(if_stmt.else_stmt)
+
+        def if_else_statement(f):
+            if condition(f):
+                return then_stmt(f)
+            return else_stmt(f)
+        return if_else_statement
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        condition = self.eval(while_stmt.condition)
+        body = self.exec(while_stmt.body)
+
+        def while_statement(f):
+            while condition(f):
+                result = body(f)
+                if result is not None:
+                    return result
+        return while_statement
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        iterator = self.eval(for_stmt.iterator)
+        body = self.exec(for_stmt.body)
+        slot = for_stmt.slot
+
+        def for_statement(f):
+            for item in iterator(f):
+                f[slot] = item
+                result = body(f)
+                if result is not None:
+                    return result
+        return for_statement
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if return_stmt.expr is None:
+            return lambda f: (None,)
+        expr = self.eval(return_stmt.expr)
+        return lambda f: (expr(f),)
+
+    def eval(self, expr: Expression):
+        return expr.accept(self)
+
+    def exec(self, statement: Statement):
+        return statement.accept(self)
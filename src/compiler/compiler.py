@@ -0,0 +1,314 @@
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import List, Optional
+
+from compiler.bytecode import (
+    ADD,
+    BAND,
+    BOR,
+    BUILD_ARRAY,
+    BXOR,
+    CALL,
+    CONST,
+    CONST_ARRAY,
+    DEFINE_GLOBAL,
+    DIV,
+    DUP,
+    EQUAL,
+    FOR_ITER,
+    FUNCTION,
+    GET_ITER,
+    GREATER,
+    GREATER_EQUAL,
+    INDEX,
+    INPLACE_ADD,
+    INPLACE_SUB,
+    JUMP,
+    LESS,
+    LESS_EQUAL,
+    LOAD_GLOBAL,
+    LOAD_LOCAL,
+    LOAD_OUTER,
+    MOD,
+    MUL,
+    NEGATE,
+    NOT,
+    NOT_EQUAL,
+    POP,
+    POP_JUMP_IF_FALSE,
+    POP_JUMP_IF_TRUE,
+    RETURN,
+    STORE_GLOBAL,
+    STORE_INDEX,
+    STORE_LOCAL,
+    STORE_OUTER,
+    SUB,
+    TAIL_CALL,
+    TO_BOOL,
+    CodeObject,
+)
+from lexer.tokens import TokenType
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+BINARY_OPS = {
+    TokenType.PLUS: ADD,
+    TokenType.MINUS: SUB,
+    TokenType.STAR: MUL,
+    TokenType.SLASH: DIV,
+    TokenType.MOD: MOD,
+    TokenType.AMPERSAND: BAND,
+    TokenType.PIPE: BOR,
+    TokenType.XOR: BXOR,
+    TokenType.GREATER: GREATER,
+    TokenType.GREATER_EQUAL: GREATER_EQUAL,
+    TokenType.LESS: LESS,
+    TokenType.LESS_EQUAL: LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: EQUAL,
+    TokenType.BANG_EQUAL: NOT_EQUAL,
+}
+
+
+class Compiler(ExpressionVisitor, StatementVisitor):
+    """Lowers a resolved AST to bytecode; run the Resolver over it first."""
+
+    def __init__(self):
+        self.code: Optional[CodeObject] = None
+        self.line = 0
+
+    def compile(self, statements: List[Statement], slots: int = 0) -> CodeObject:
+        self.code = CodeObject("<script>")
+        self.code.nlocals = slots
+        for statement in statements:
+            self.exec(statement)
+        self.emit(CONST, self.constant(None))
+        self.emit(RETURN)
+        return self.code
+
+    # Emission helpers
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        return self.code.emit(op, arg, self.line)
+
+    def constant(self, value: object) -> int:
+        return self.code.constant(value)
+
+    def here(self) -> int:
+        return len(self.code.code)
+
+    def patch(self, at: int):
+        self.code.patch(at, self.here())
+
+    # Variable access at Resolver coordinates
+
+    def load(self, name: str, depth: Optional[int], slot: Optional[int]):
+        if depth is None:
+            self.emit(LOAD_GLOBAL, self.constant(name))
+        elif depth == 0:
+            self.emit(LOAD_LOCAL, slot)
+        else:
+            self.emit(LOAD_OUTER, self.constant((depth, slot)))
+
+    def store(self, name: str, depth: Optional[int], slot: Optional[int]):
+        if depth is None:
+            self.emit(STORE_GLOBAL, self.constant(name))
+        elif depth == 0:
+            self.emit(STORE_LOCAL, slot)
+        else:
+            self.emit(STORE_OUTER, self.constant((depth, slot)))
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal):
+        self.emit(CONST, self.constant(literal.value))
+
+    def visit_grouping(self, grouping: Grouping):
+        self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary):
+        self.eval(unary.right)
+        self.line = unary.op.line
+        if unary.op.type == TokenType.BANG:
+            self.emit(NOT)
+        elif unary.op.type == TokenType.MINUS:
+            self.emit(NEGATE)
+
+    def visit_array(self, array: Array):
+        for element in array.elements:
+            self.eval(element)
+        self.emit(BUILD_ARRAY, len(array.elements))
+
+    def visit_constant_array(self, constant_array: ConstantArray):
+        self.emit(CONST_ARRAY, self.constant(constant_array))
+
+    def visit_array_access(self, array_access: ArrayAccess):
+        self.eval(array_access.array)
+        self.eval(array_access.index)
+        self.line = array_access.bracket.line
+        self.emit(INDEX)
+
+    def visit_call(self, call: Call, op: int = CALL):
+        self.eval(call.callee)
+        for arg in call.args:
+            self.eval(arg)
+        self.line = call.paren.line
+        self.emit(op, len(call.args))
+
+    def visit_binary(self, binary: Binary):
+        self.eval(binary.left)
+        self.eval(binary.right)
+        self.line = binary.op.line
+        self.emit(BINARY_OPS[binary.op.type], self.constant(binary.op))
+
+    def visit_logical(self, logical: Logical):
+        self.eval(logical.left)
+        short_circuit = self.emit(
+            POP_JUMP_IF_TRUE if logical.op.type == TokenType.OR else POP_JUMP_IF_FALSE)
+        self.eval(logical.right)
+        self.emit(TO_BOOL)
+        end = self.emit(JUMP)
+        self.patch(short_circuit)
+        self.emit(CONST, self.constant(logical.op.type == TokenType.OR))
+        self.patch(end)
+
+    def visit_assignment(self, assignment: Assignment, keep: bool = True):
+        self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            self.eval(assignment.target.array)
+            self.eval(assignment.target.index)
+            self.line = assignment.target.bracket.line
+            self.emit(STORE_INDEX, self.constant(assignment.operator))
+            if not keep:
+                self.emit(POP)
+            return
+
+        name = assignment.target.lexeme
+        self.line = assignment.target.line
+        if assignment.operator == TokenType.PLUS_EQUAL:
+            self.load(name, assignment.depth, assignment.slot)
+            self.emit(INPLACE_ADD)
+        elif assignment.operator == TokenType.MINUS_EQUAL:
+            self.load(name, assignment.depth, assignment.slot)
+            self.emit(INPLACE_SUB)
+        if keep:
+            self.emit(DUP)
+        self.store(name, assignment.depth, assignment.slot)
+
+    def visit_variable(self, variable: Variable):
+        self.line = variable.name.line
+        self.load(variable.name.lexeme, variable.depth, variable.slot)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        # A statement-level assignment needs no copy of its value
+        if isinstance(expression_stmt.expr, Assignment):
+            self.visit_assignment(expression_stmt.expr, keep=False)
+            return
+        self.eval(expression_stmt.expr)
+        self.emit(POP)
+
+    def visit_var(self, var: Var):
+        if var.initializer is not None:
+            self.eval(var.initializer)
+        else:
+            self.emit(CONST, self.constant(None))
+        self.line = var.name.line
+        if var.depth is None:
+            self.emit(DEFINE_GLOBAL, self.constant(var.name.lexeme))
+        else:
+            self.store(var.name.lexeme, var.depth, var.slot)
+
+    def visit_block(self, block: Block, new_env=None):
+        for statement in block.statements:
+            if statement is not None:
+                self.exec(statement)
+
+    def visit_function(self, function: Function):
+        enclosing = self.code
+        self.code = CodeObject(function.name.lexeme, len(function.parameters), function)
+        self.code.nlocals = function.slots
+        for statement in function.body.statements:
+            if statement is not None:
+                self.exec(statement)
+        self.emit(CONST, self.constant(None))
+        self.emit(RETURN)
+        code, self.code = self.code, enclosing
+
+        self.line = function.name.line
+        self.emit(FUNCTION, self.constant(code))
+        if function.depth is None:
+            self.emit(DEFINE_GLOBAL, self.constant(function.name.lexeme))
+        else:
+            self.emit(STORE_LOCAL, function.slot)
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.eval(if_stmt.condition)
+        skip_then = self.emit(POP_JUMP_IF_FALSE)
+        self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is None:
+            self.patch(skip_then)
+            return
+        skip_else = self.emit(JUMP)
+        self.patch(skip_then)
+        self.exec(if_stmt.else_stmt)
+        self.patch(skip_else)
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        start = self.here()
+        self.eval(while_stmt.condition)
+        exit = self.emit(POP_JUMP_IF_FALSE)
+        self.exec(while_stmt.body)
+        self.emit(JUMP, start)
+        self.patch(exit)
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        self.eval(for_stmt.iterator)
+        self.line = for_stmt.name.line
+        self.emit(GET_ITER)
+        start = self.here()
+        exit = self.emit(FOR_ITER)
+        self.emit(STORE_LOCAL, for_stmt.slot)
+        self.exec(for_stmt.body)
+        self.emit(JUMP, start)
+        self.patch(exit)
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if isinstance(return_stmt.expr, Call):
+            # The RETURN only runs if the callee turns out not to be a
+            # py0 function, which TAIL_CALL can't jump into
+            self.visit_call(return_stmt.expr, TAIL_CALL)
+        elif return_stmt.expr is not None:
+            self.eval(return_stmt.expr)
+        else:
+            self.emit(CONST, self.constant(None))
+        self.line = return_stmt.keyword.line
+        self.emit(RETURN)
+
+    def eval(self, expr: Expression):
+        expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
@@ -0,0 +1,212 @@
+from copy import deepcopy
+from parser.grammar.expression import Call, Expression, Grouping, Literal, Logical, Unary, Variable
+from parser.grammar.functions import Callable
+from parser.grammar.statements import (
+    Block,
+    Contract,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import List, Optional
+
+from lexer.tokens import Token, TokenType
+from util.errors import error
+from util.visitor import StatementVisitor
+
+MODES = ["off", "requires", "full"]
+
+
+def parse_mode(text: str):
+    """Reads off, requires, full or sample:N into (mode, N)."""
+    if text in MODES:
+        return text, 1
+    if text.startswith("sample:"):
+        try:
+            every = int(text[len("sample:"):])
+        except ValueError:
+            every = 0
+        if every >= 1:
+            return "sample", every
+    raise ValueError(f"invalid contracts mode '{text}': expected off, requires, full "
+                     f"or sample:N with N >= 1")
+
+
+class ContractFailure(Callable):
+    """
+    Called by a lowered check whose condition came out false, with the
+    clause's message if it has one.
+    """
+
+    def __init__(self, keyword: Token, has_message: bool = False):
+        self.kind = keyword.lexeme
+        self.line = keyword.line
+        self.has_message = has_message
+
+    def call(self, interpreter, args):
+        if args:
+            error(self.line, f"{self.kind} clause failed: {args[0]}")
+        error(self.line, f"{self.kind} clause failed")
+
+    def arity(self):
+        return 1 if self.has_message else 0
+
+
+class Sampler(Callable):
+    """
+    True on the first call and every Nth one after it. The count is kept
+    by the runtime, not here in the tree, so each run samples from scratch.
+    """
+
+    def __init__(self, every: int):
+        self.every = every
+
+    def call(self, interpreter, args):
+        samples = interpreter.samples
+        count = samples.get(self, 0)
+        samples[self] = (count + 1) % self.every
+        return count == 0
+
+    def arity(self):
+        return 0
+
+
+class ContractLowering(StatementVisitor):
+    """
+    Turns contract clauses into ordinary statements, before the optimizer
+    and resolver run, so every engine executes them without knowing about
+    contracts.
+
+    requires clauses are checked on entry to the function. ensures clauses
+    are checked at every return, and at the end of the body, with \\res
+    bound to a local holding the value being returned. A loop_invariant is
+    checked before each test of a while condition, and at the start of
+    each iteration of a for loop, once the loop variable is bound.
+
+    Modes: off drops every clause, so nothing is left to execute;
+    requires keeps only the requires clauses; full keeps them all; and
+    sample:N checks each check site on its first evaluation and every Nth
+    one after that.
+
+    The deprecated requires(condition, message); call, which the parser
+    leaves as a call to the keyword, is a check site of its own, made
+    where it stands and reporting the message when it fails.
+    """
+
+    def __init__(self, mode: str = "full", every: int = 1):
+        self.mode = mode
+        self.every = every
+        self.ensures: Optional[List[Contract]] = None
+
+    def lower(self, statements: List[Statement]) -> List[Statement]:
+        return [self.exec(statement) if statement is not None else None
+                for statement in statements]
+
+    def enabled(self, keyword: Token) -> bool:
+        if self.mode == "off":
+            return False
+        if self.mode == "requires":
+            return keyword.type == TokenType.REQUIRES
+        return True
+
+    def checks(self, clauses: List[Contract]) -> List[Statement]:
+        """if !(condition) { fail(); } for each clause the mode keeps."""
+        statements = []
+        for clause in clauses:
+            if not self.enabled(clause.keyword):
+                continue
+            keyword = clause.keyword
+            # Each check site gets its own copy; the Resolver annotates nodes in place
+            condition = Unary(Token(TokenType.BANG, "!", None, keyword.line),
+                              Grouping(deepcopy(clause.condition)))
+            if self.mode == "sample":
+                due = Call(Literal(Sampler(self.every)), keyword, [])
+                condition = Logical(due, Token(TokenType.AND, "and", None, keyword.line),
+                                    condition)
+            if clause.message is None:
+                fail = Call(Literal(ContractFailure(keyword)), keyword, [])
+            else:
+                fail = Call(Literal(ContractFailure(keyword, True)), keyword,
+                            [deepcopy(clause.message)])
+            statements.append(IfStatement(condition, Block([ExpressionStatement(fail)])))
+        return statements
+
+    def result(self, keyword: Token, value: Expression) -> List[Statement]:
+        """Binds \\res to value, then checks the enclosing function's ensures."""
+        name = Token(TokenType.RESULT, "\\res", None, keyword.line)
+        return [Var(name, value)] + self.checks(self.ensures)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        expr = expression_stmt.expr
+        if (isinstance(expr, Call) and isinstance(expr.callee, Variable)
+                and expr.callee.name.type in (TokenType.REQUIRES, TokenType.ENSURES)):
+            condition, message = expr.args
+            return Block(self.checks([Contract(expr.callee.name, condition, message)]))
+        return expression_stmt
+
+    def visit_var(self, var: Var):
+        return var
+
+    def visit_block(self, block: Block, new_env=None):
+        block.statements = self.lower(block.statements)
+        return block
+
+    def visit_function(self, function: Function):
+        enclosing = self.ensures
+        ensures = [c for c in function.ensures if self.enabled(c.keyword)]
+        self.ensures = ensures or None
+
+        body = self.checks(function.requires) + self.lower(function.body.statements)
+        if ensures:
+            # Falling off the end returns None, which the ensures see too
+            end = function.name
+            body.append(Block(self.result(end, Literal(None))))
+        function.body.statements = body
+        function.requires, function.ensures = [], []
+
+        self.ensures = enclosing
+        return function
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        if_stmt.then_stmt = self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            if_stmt.else_stmt = self.exec(if_stmt.else_stmt)
+        return if_stmt
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        while_stmt.body = self.exec(while_stmt.body)
+        checks = self.checks(while_stmt.invariants)
+        if not checks:
+            while_stmt.invariants = []
+            return while_stmt
+        # Before the first test, then at the end of every iteration, right
+        # before the next; the two sites are sampled separately
+        while_stmt.body.statements.extend(self.checks(while_stmt.invariants))
+        while_stmt.invariants = []
+        return Block(checks + [while_stmt])
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        for_stmt.body = self.exec(for_stmt.body)
+        checks = self.checks(for_stmt.invariants)
+        for_stmt.invariants = []
+        for_stmt.body.statements[:0] = checks
+        return for_stmt
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if self.ensures is None:
+            return return_stmt
+        value = return_stmt.expr if return_stmt.expr is not None else Literal(None)
+        keyword = return_stmt.keyword
+        statements = self.result(keyword, value)
+        result = Variable(Token(TokenType.RESULT, "\\res", None, keyword.line))
+        return Block(statements + [ReturnStatement(keyword, result)])
+
+    def exec(self, statement: Statement) -> Statement:
+        return statement.accept(self)
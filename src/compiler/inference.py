@@ -0,0 +1,407 @@
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from collections import Counter, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from lexer.tokens import TokenType
+from util.visitor import ExpressionVisitor, StatementVisitor, walk
+
+# Type tags, ordered as a lattice: NEVER (no value seen yet) below the
+# concrete tags below ANY. "array" is a list or a typed array, and "range"
+# is what range() returns; both can be indexed.
+NEVER = "never"
+ANY = "any"
+INT, FLOAT, STR, BOOL, ARRAY, RANGE = "int", "float", "str", "bool", "array", "range"
+NUMBERS = (INT, FLOAT)
+INDEXABLE = (ARRAY, RANGE)
+
+# What a native returns, as long as the program never rebinds its name
+NATIVES = {
+    "len": INT,
+    "range": RANGE,
+    "input": STR,
+    "input_int": INT,
+    "input_float": FLOAT,
+    "read_all": STR,
+    "read_lines": ARRAY,
+    "read_ints": ARRAY,
+    "parse_int": INT,
+    "parse_float": FLOAT,
+    "split": ARRAY,
+    "zeros": ARRAY,
+    "fill": ARRAY,
+    "int_array": ARRAY,
+    "float_array": ARRAY,
+    "add": ARRAY,
+    "mul": ARRAY,
+    "prefix_sum": ARRAY,
+    "map_scale": ARRAY,
+    "pmap": ARRAY,
+}
+
+ARITHMETIC = (TokenType.PLUS, TokenType.MINUS, TokenType.STAR)
+BITWISE = (TokenType.AMPERSAND, TokenType.PIPE, TokenType.XOR)
+ORDERING = (TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL)
+EQUALITY = (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+
+
+def join(a: str, b: str) -> str:
+    if a == NEVER or a == b:
+        return b
+    if b == NEVER:
+        return a
+    return ANY
+
+
+def of_value(value: object) -> str:
+    if type(value) is bool:
+        return BOOL
+    if type(value) is int:
+        return INT
+    if type(value) is float:
+        return FLOAT
+    if type(value) is str:
+        return STR
+    return ANY
+
+
+def binary_type(kind: TokenType, left: str, right: str) -> str:
+    """The tag of a binary result, or ANY when it may fail or can't be told."""
+    if NEVER in (left, right):
+        return NEVER
+    if kind in EQUALITY:
+        return BOOL
+    if kind in ORDERING:
+        if (left in NUMBERS and right in NUMBERS) or left == right == STR:
+            return BOOL
+        return ANY
+    if kind in BITWISE:
+        return INT if left == right == INT else ANY
+    if kind == TokenType.SLASH:
+        return FLOAT if left in NUMBERS and right in NUMBERS else ANY
+    if kind in ARITHMETIC and left in NUMBERS and right in NUMBERS:
+        return INT if left == right == INT else FLOAT
+    if kind == TokenType.PLUS and left == right == STR:
+        return STR
+    if kind == TokenType.STAR and INT in (left, right) and {left, right} & {STR, ARRAY}:
+        return STR if STR in (left, right) else ARRAY
+    return ANY
+
+
+class TypeInference(ExpressionVisitor, StatementVisitor):
+    """
+    Proves the type tags of local variables and expressions ahead of time,
+    and marks the Binary and ArrayAccess nodes whose dynamic type checks
+    can never fail as safe. Run it after the Resolver.
+
+    Only frame slots are tracked: a slot's tag is the join of everything
+    stored into it by its own function, and a slot written from a nested
+    function, or a global, is ANY. A top-level def bound exactly once gets
+    its parameter tags from its call sites, unless its name is ever used
+    other than to call it, and its calls get the tag of what it returns.
+
+    The script and each top-level def are analyzed on their own, until
+    their slot tags stop changing; a unit is only analyzed again when the
+    parameter or return tags it read have changed, so every unit is
+    visited a bounded number of times. Then the safe operations are
+    marked in one last pass.
+
+    With whole_program off (statements fed in one by one) later statements
+    may still call a def or rebind a native, so parameters and the results
+    of natives are all ANY.
+    """
+
+    def __init__(self, whole_program: bool = True):
+        self.whole_program = whole_program
+        # (frame owner, slot) -> tag; owners are Functions or None for the script
+        self.slots: Dict[Tuple[int, int], str] = {}
+        self.frames: List[Optional[Function]] = []
+        self.bindings = Counter()
+        self.defs: Dict[str, Function] = {}
+        self.escaped: Set[str] = set()
+        # def name -> parameter index -> tag
+        self.params: Dict[str, Dict[int, str]] = {}
+        self.returns: Dict[int, str] = {}
+        # Units are the script (None) and the top-level defs, by id
+        self.units: Dict[int, Optional[Function]] = {}
+        self.unit: Optional[Function] = None
+        # ("params", name) or ("returns", id of a def) -> ids of the units
+        # that read it
+        self.readers: Dict[tuple, Set[int]] = {}
+        self.pending: deque = deque()
+        self.queued: Set[int] = set()
+        self.changed = False
+        self.marking = False
+
+    def infer(self, statements: List[Statement]):
+        self.collect_globals(statements)
+        for unit in self.units.values():
+            self.enqueue(id(unit))
+        while self.pending:
+            key = self.pending.popleft()
+            self.queued.discard(key)
+            self.analyze(statements, self.units[key])
+        self.marking = True
+        for unit in self.units.values():
+            self.visit_unit(statements, unit)
+
+    def analyze(self, statements: List[Statement], unit: Optional[Function]):
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.visit_unit(statements, unit)
+
+    def visit_unit(self, statements: List[Statement], unit: Optional[Function]):
+        self.unit = unit
+        if unit is None:
+            self.walk(statements)
+        else:
+            self.frames = [None]
+            self.exec(unit)
+
+    def enqueue(self, key: int):
+        if key not in self.queued:
+            self.queued.add(key)
+            self.pending.append(key)
+
+    def read(self, fact: tuple):
+        self.readers.setdefault(fact, set()).add(id(self.unit))
+
+    def update(self, tags: dict, key, tag: str, fact: tuple):
+        """Widens a parameter or return tag, and has whoever read it look again."""
+        if self.widen(tags, key, tag):
+            for reader in self.readers.get(fact, ()):
+                self.enqueue(reader)
+
+    def collect_globals(self, statements: List[Statement]):
+        callees = set()
+        names = []
+        self.units[id(None)] = None
+        for statement in statements:
+            if statement is None:
+                continue
+            for node in walk(statement):
+                if isinstance(node, Var) and node.depth is None:
+                    self.bindings[node.name.lexeme] += 1
+                elif isinstance(node, Function) and node.depth is None:
+                    self.bindings[node.name.lexeme] += 1
+                    self.defs[node.name.lexeme] = node
+                    self.units[id(node)] = node
+                elif (isinstance(node, Assignment) and not isinstance(node.target, ArrayAccess)
+                      and node.depth is None):
+                    self.bindings[node.target.lexeme] += 1
+                elif isinstance(node, Call) and isinstance(node.callee, Variable):
+                    callees.add(id(node.callee))
+                elif isinstance(node, Variable) and node.depth is None:
+                    names.append(node)
+        # A def whose value is taken can be called with anything
+        self.escaped = {variable.name.lexeme for variable in names
+                        if id(variable) not in callees}
+        for name, function in self.defs.items():
+            if self.bindings[name] == 1:
+                self.params[name] = {}
+
+    def direct(self, name: str) -> bool:
+        """Whether name is only ever a once-bound top-level def, called by name."""
+        return (self.whole_program and name in self.params
+                and name not in self.escaped)
+
+    def walk(self, statements: List[Statement]):
+        self.frames = [None]
+        for statement in statements:
+            if statement is not None:
+                self.exec(statement)
+
+    def key(self, depth: int, slot: int) -> Tuple[int, int]:
+        return id(self.frames[-1 - depth]), slot
+
+    def widen(self, tags: dict, key, tag: str) -> bool:
+        old = tags.get(key, NEVER)
+        new = join(old, tag)
+        if new == old:
+            return False
+        tags[key] = new
+        return True
+
+    def store(self, depth: Optional[int], slot: Optional[int], tag: str):
+        if depth is None:
+            return
+        if depth > 0:
+            tag = ANY
+        if self.widen(self.slots, self.key(depth, slot), tag):
+            self.changed = True
+            if self.unit is not None and depth >= len(self.frames) - 1:
+                # A slot of the script's frame, written from a def
+                self.enqueue(id(None))
+
+    def load(self, depth: Optional[int], slot: Optional[int]) -> str:
+        if depth != 0:
+            return ANY
+        return self.slots.get(self.key(0, slot), NEVER)
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal) -> str:
+        return of_value(literal.value)
+
+    def visit_grouping(self, grouping: Grouping) -> str:
+        return self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary) -> str:
+        right = self.eval(unary.right)
+        if unary.op.type == TokenType.BANG:
+            return BOOL
+        return right if right in NUMBERS or right == NEVER else ANY
+
+    def visit_array(self, array: Array) -> str:
+        for element in array.elements:
+            self.eval(element)
+        return ARRAY
+
+    def visit_constant_array(self, constant_array: ConstantArray) -> str:
+        return ARRAY
+
+    def visit_array_access(self, array_access: ArrayAccess) -> str:
+        array = self.eval(array_access.array)
+        index = self.eval(array_access.index)
+        if self.marking:
+            array_access.safe = array in INDEXABLE and index == INT
+        # Not INT for a range: storing an element can put anything there
+        return ANY
+
+    def visit_call(self, call: Call) -> str:
+        self.eval(call.callee)
+        args = [self.eval(arg) for arg in call.args]
+        callee = call.callee
+        if not isinstance(callee, Variable) or callee.depth is not None:
+            return ANY
+        name = callee.name.lexeme
+        if name in self.params:
+            if self.direct(name):
+                for i, tag in enumerate(args[:len(self.defs[name].parameters)]):
+                    self.update(self.params[name], i, tag, ("params", name))
+            function = self.defs[name]
+            self.read(("returns", id(function)))
+            return self.returns.get(id(function), NEVER)
+        if self.bindings[name] == 0 and self.whole_program:
+            return NATIVES.get(name, ANY)
+        return ANY
+
+    def visit_binary(self, binary: Binary) -> str:
+        left = self.eval(binary.left)
+        right = self.eval(binary.right)
+        tag = binary_type(binary.op.type, left, right)
+        if self.marking:
+            binary.safe = tag not in (ANY, NEVER)
+        return tag
+
+    def visit_logical(self, logical: Logical) -> str:
+        self.eval(logical.left)
+        self.eval(logical.right)
+        return BOOL
+
+    def visit_assignment(self, assignment: Assignment) -> str:
+        tag = self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            self.eval(assignment.target.array)
+            self.eval(assignment.target.index)
+            return ANY
+
+        if assignment.operator == TokenType.PLUS_EQUAL:
+            tag = binary_type(TokenType.PLUS, self.load(assignment.depth, assignment.slot), tag)
+        elif assignment.operator == TokenType.MINUS_EQUAL:
+            tag = binary_type(TokenType.MINUS, self.load(assignment.depth, assignment.slot), tag)
+        self.store(assignment.depth, assignment.slot, tag)
+        return tag
+
+    def visit_variable(self, variable: Variable) -> str:
+        return self.load(variable.depth, variable.slot)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        self.eval(expression_stmt.expr)
+
+    def visit_var(self, var: Var):
+        tag = self.eval(var.initializer) if var.initializer is not None else ANY
+        self.store(var.depth, var.slot, tag)
+
+    def visit_block(self, block: Block, new_env=None):
+        for statement in block.statements:
+            if statement is not None:
+                self.exec(statement)
+
+    def visit_function(self, function: Function):
+        self.store(function.depth, function.slot, ANY)
+        if function.depth is None and function is not self.unit:
+            # A top-level def is a unit of its own
+            return
+        self.frames.append(function)
+        name = function.name.lexeme
+        direct = function.depth is None and self.defs.get(name) is function and self.direct(name)
+        if direct:
+            self.read(("params", name))
+        for slot in range(len(function.parameters)):
+            self.store(0, slot, self.params[name].get(slot, NEVER) if direct else ANY)
+        statements = function.body.statements
+        for statement in statements:
+            if statement is not None:
+                self.exec(statement)
+        if not statements or not isinstance(statements[-1], ReturnStatement):
+            # Falling off the end returns None
+            self.update(self.returns, id(function), ANY, ("returns", id(function)))
+        self.frames.pop()
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.eval(if_stmt.condition)
+        self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            self.exec(if_stmt.else_stmt)
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        self.eval(while_stmt.condition)
+        self.exec(while_stmt.body)
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        iterator = self.eval(for_stmt.iterator)
+        # Only a range made for the loop itself is sure to still hold ints
+        call = for_stmt.iterator
+        fresh = (iterator == RANGE and isinstance(call, Call)
+                 and isinstance(call.callee, Variable) and call.callee.name.lexeme == "range")
+        self.store(0, for_stmt.slot, INT if fresh else ANY)
+        self.exec(for_stmt.body)
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        tag = self.eval(return_stmt.expr) if return_stmt.expr is not None else ANY
+        function = self.frames[-1]
+        if function is not None:
+            self.update(self.returns, id(function), tag, ("returns", id(function)))
+
+    def eval(self, expr: Expression) -> str:
+        return expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
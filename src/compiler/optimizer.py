@@ -0,0 +1,188 @@
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import List, Optional
+
+from interpreter.interpreter import Interpreter
+from lexer.tokens import TokenType
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+FOLDABLE = (int, float, str, bool, type(None))
+
+
+class Optimizer(ExpressionVisitor, StatementVisitor):
+    """
+    Rewrites the AST before resolution (-O1).
+
+    Operators over literals are folded by running them through the tree
+    walker itself, so a folded value is exactly what execution would have
+    produced; anything that raises is left for run time. if/while
+    statements with constant conditions lose their dead branches, and array
+    literals of constants become ConstantArray templates that are copied
+    instead of rebuilt element by element.
+    """
+
+    def __init__(self):
+        self.evaluator = Interpreter()
+
+    def optimize(self, statements: List[Statement]) -> List[Statement]:
+        return self.optimize_all(statements)
+
+    def optimize_all(self, statements: List[Statement]) -> List[Statement]:
+        optimized = []
+        for statement in statements:
+            if statement is None:
+                optimized.append(statement)
+                continue
+            statement = self.exec(statement)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def fold(self, expr: Expression) -> Expression:
+        try:
+            value = self.evaluator.eval(expr)
+        except Exception:
+            return expr
+        if not isinstance(value, FOLDABLE):
+            return expr
+        return Literal(value)
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal) -> Expression:
+        return literal
+
+    def visit_grouping(self, grouping: Grouping) -> Expression:
+        return self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary) -> Expression:
+        unary.right = self.eval(unary.right)
+        if isinstance(unary.right, Literal):
+            return self.fold(unary)
+        return unary
+
+    def visit_array(self, array: Array) -> Expression:
+        array.elements = [self.eval(element) for element in array.elements]
+        if all(isinstance(element, (Literal, ConstantArray)) for element in array.elements):
+            return ConstantArray([
+                element.values if isinstance(element, ConstantArray) else element.value
+                for element in array.elements])
+        return array
+
+    def visit_constant_array(self, constant_array: ConstantArray) -> Expression:
+        return constant_array
+
+    def visit_array_access(self, array_access: ArrayAccess) -> Expression:
+        array_access.array = self.eval(array_access.array)
+        array_access.index = self.eval(array_access.index)
+        return array_access
+
+    def visit_call(self, call: Call) -> Expression:
+        call.callee = self.eval(call.callee)
+        call.args = [self.eval(arg) for arg in call.args]
+        return call
+
+    def visit_binary(self, binary: Binary) -> Expression:
+        binary.left = self.eval(binary.left)
+        binary.right = self.eval(binary.right)
+        if isinstance(binary.left, Literal) and isinstance(binary.right, Literal):
+            return self.fold(binary)
+        return binary
+
+    def visit_logical(self, logical: Logical) -> Expression:
+        logical.left = self.eval(logical.left)
+        logical.right = self.eval(logical.right)
+        if isinstance(logical.left, Literal):
+            left = bool(logical.left.value)
+            if logical.op.type == TokenType.OR and left:
+                return Literal(True)
+            if logical.op.type == TokenType.AND and not left:
+                return Literal(False)
+            if isinstance(logical.right, Literal):
+                return Literal(bool(logical.right.value))
+        return logical
+
+    def visit_assignment(self, assignment: Assignment) -> Expression:
+        assignment.value = self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            assignment.target = self.eval(assignment.target)
+        return assignment
+
+    def visit_variable(self, variable: Variable) -> Expression:
+        return variable
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement) -> Statement:
+        expression_stmt.expr = self.eval(expression_stmt.expr)
+        return expression_stmt
+
+    def visit_var(self, var: Var) -> Statement:
+        if var.initializer is not None:
+            var.initializer = self.eval(var.initializer)
+        return var
+
+    def visit_block(self, block: Block, new_env=None) -> Statement:
+        block.statements = self.optimize_all(block.statements)
+        return block
+
+    def visit_function(self, function: Function) -> Statement:
+        self.visit_block(function.body)
+        return function
+
+    def visit_if_statement(self, if_stmt: IfStatement) -> Optional[Statement]:
+        if_stmt.condition = self.eval(if_stmt.condition)
+        if_stmt.then_stmt = self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            if_stmt.else_stmt = self.exec(if_stmt.else_stmt)
+        if isinstance(if_stmt.condition, Literal):
+            if if_stmt.condition.value:
+                return if_stmt.then_stmt
+            return if_stmt.else_stmt
+        return if_stmt
+
+    def visit_while_statement(self, while_stmt: WhileStatement) -> Optional[Statement]:
+        while_stmt.condition = self.eval(while_stmt.condition)
+        if isinstance(while_stmt.condition, Literal) and not while_stmt.condition.value:
+            return None
+        while_stmt.body = self.exec(while_stmt.body)
+        return while_stmt
+
+    def visit_for_statement(self, for_stmt: ForStatement) -> Statement:
+        for_stmt.iterator = self.eval(for_stmt.iterator)
+        for_stmt.body = self.exec(for_stmt.body)
+        return for_stmt
+
+    def visit_return_statement(self, return_stmt: ReturnStatement) -> Statement:
+        if return_stmt.expr is not None:
+            return_stmt.expr = self.eval(return_stmt.expr)
+        return return_stmt
+
+    def eval(self, expr: Expression) -> Expression:
+        return expr.accept(self)
+
+    def exec(self, statement: Statement) -> Optional[Statement]:
+        return statement.accept(self)
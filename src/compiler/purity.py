@@ -0,0 +1,212 @@
+from collections import Counter
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import Dict, List, Optional, Set
+
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+# Natives whose result depends only on their arguments and that touch
+# nothing else. print, input and the other I/O natives are the ones left out.
+PURE_NATIVES = {
+    "len", "range", "parse_int", "parse_float", "split", "assert", "zeros", "fill",
+    "int_array", "float_array", "sum", "min", "max", "dot", "add", "mul",
+    "prefix_sum", "map_scale",
+}
+
+
+class FunctionFacts:
+    def __init__(self, function: Function):
+        self.function = function
+        self.local = True
+        self.calls: Set[str] = set()
+
+
+class PurityAnalyzer(ExpressionVisitor, StatementVisitor):
+    """
+    Marks every Function with pure = True or False. Run it after the Resolver.
+
+    A pure function is a top-level def that only reads its own frame,
+    assigns only to its own locals (never into an array), and calls
+    nothing but pure natives and other pure defs by their global names,
+    never a function it was passed.
+    Calling it again with equal arguments gives an equal result and has no
+    other effect, so the result may be reused. Names bound more than once
+    anywhere in the program can't be trusted to still be the def (or the
+    native) by the time they are called.
+    """
+
+    def __init__(self):
+        self.facts: Dict[str, FunctionFacts] = {}
+        self.bindings = Counter()
+        self.current: Optional[FunctionFacts] = None
+
+    def analyze(self, statements: List[Statement]) -> Set[str]:
+        """Marks the functions, returning the names of the pure ones."""
+        for statement in statements:
+            if statement is not None:
+                self.exec(statement)
+
+        pure = {name for name, facts in self.facts.items()
+                if facts.local and self.bindings[name] == 1}
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not all(self.callable(callee, pure) for callee in self.facts[name].calls):
+                    pure.discard(name)
+                    changed = True
+
+        for name in pure:
+            self.facts[name].function.pure = True
+        return pure
+
+    def callable(self, name: str, pure: Set[str]) -> bool:
+        if name in pure:
+            return True
+        return name in PURE_NATIVES and self.bindings[name] == 0
+
+    def impure(self):
+        if self.current is not None:
+            self.current.local = False
+
+    def bind(self, name: str, depth: Optional[int]):
+        if depth is None:
+            self.bindings[name] += 1
+            self.impure()
+        elif depth != 0:
+            self.impure()
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal):
+        pass
+
+    def visit_grouping(self, grouping: Grouping):
+        self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary):
+        self.eval(unary.right)
+
+    def visit_array(self, array: Array):
+        for element in array.elements:
+            self.eval(element)
+
+    def visit_constant_array(self, constant_array: ConstantArray):
+        pass
+
+    def visit_array_access(self, array_access: ArrayAccess):
+        self.eval(array_access.array)
+        self.eval(array_access.index)
+
+    def visit_call(self, call: Call):
+        callee = call.callee
+        if isinstance(callee, Variable) and callee.depth is None:
+            if self.current is not None:
+                self.current.calls.add(callee.name.lexeme)
+        else:
+            # A parameter or any other computed callee may be anything,
+            # print included
+            self.impure()
+            self.eval(callee)
+        for arg in call.args:
+            self.eval(arg)
+
+    def visit_binary(self, binary: Binary):
+        self.eval(binary.left)
+        self.eval(binary.right)
+
+    def visit_logical(self, logical: Logical):
+        self.eval(logical.left)
+        self.eval(logical.right)
+
+    def visit_assignment(self, assignment: Assignment):
+        self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            # The array may be an argument, or reachable from one
+            self.eval(assignment.target)
+            self.impure()
+        else:
+            self.bind(assignment.target.lexeme, assignment.depth)
+
+    def visit_variable(self, variable: Variable):
+        # Globals and captured variables may change between calls
+        if variable.depth != 0:
+            self.impure()
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        self.eval(expression_stmt.expr)
+
+    def visit_var(self, var: Var):
+        if var.initializer is not None:
+            self.eval(var.initializer)
+        self.bind(var.name.lexeme, var.depth)
+
+    def visit_block(self, block: Block, new_env=None):
+        for statement in block.statements:
+            if statement is not None:
+                self.exec(statement)
+
+    def visit_function(self, function: Function):
+        function.pure = False
+        enclosing = self.current
+        if enclosing is None and function.depth is None:
+            self.bindings[function.name.lexeme] += 1
+            self.current = self.facts[function.name.lexeme] = FunctionFacts(function)
+        else:
+            # Nested defs capture frames; their enclosing function allocates
+            # a closure per call, so neither is treated as pure
+            self.impure()
+            self.current = FunctionFacts(function)
+        for statement in function.body.statements:
+            if statement is not None:
+                self.exec(statement)
+        self.current = enclosing
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.eval(if_stmt.condition)
+        self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            self.exec(if_stmt.else_stmt)
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        self.eval(while_stmt.condition)
+        self.exec(while_stmt.body)
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        self.eval(for_stmt.iterator)
+        self.exec(for_stmt.body)
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if return_stmt.expr is not None:
+            self.eval(return_stmt.expr)
+
+    def eval(self, expr: Expression):
+        expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
@@ -0,0 +1,548 @@
+import math
+import operator
+from collections import Counter
+from parser.environment import Environment
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.functions import Callable
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import Dict, List, Optional, Set
+
+from interpreter.arrays import get_item, set_item
+from interpreter.console import Console
+from interpreter.natives import define_natives
+from interpreter.typecheck import checkzero, typecheck
+from lexer.tokens import Token, TokenType
+from util.errors import error
+from util.visitor import ExpressionVisitor, StatementVisitor, walk
+
+# Generated names: py0 globals are module globals v_<name>, locals are
+# l<function level>_<slot>_<name>, a top-level function that is never
+# rebound is also callable directly as f_<name>, natives that are never
+# rebound as n_<name>. _k<n> are constants, _t<n> temporaries.
+
+OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.MOD: operator.mod,
+    TokenType.AMPERSAND: operator.and_,
+    TokenType.PIPE: operator.or_,
+    TokenType.XOR: operator.xor,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne,
+}
+
+
+def binary(op: Token, left: object, right: object) -> object:
+    typecheck(op, left, right)
+    if op.type == TokenType.SLASH or op.type == TokenType.MOD:
+        checkzero(op, right)
+    if op.type in OPERATORS:
+        return OPERATORS[op.type](left, right)
+
+
+def undefined(e: NameError) -> Exception:
+    name = getattr(e, "name", None) or ""
+    if name[:2] in ("v_", "f_"):
+        return RuntimeError(f"Variable {name[2:]} not defined")
+    return e
+
+
+class TranspiledFunction(Callable):
+    def __init__(self, fn, name: str, nparams: int, function: Optional[Function] = None):
+        self.fn = fn
+        self.name = name
+        self.nparams = nparams
+        self.function = function
+
+    def call(self, interpreter, args):
+        try:
+            return self.fn(*args)
+        except NameError as e:
+            raise undefined(e)
+
+    def arity(self):
+        return self.nparams
+
+
+class Transpiler(ExpressionVisitor, StatementVisitor):
+    """
+    Translates a resolved AST into Python source.
+
+    Blocks need no special treatment: the Resolver gives every declaration
+    its own slot, and each slot becomes its own Python local. Operators and
+    array accesses take an inline path for int operands and in-bounds
+    lists, and otherwise fall back to the same typecheck, checkzero and
+    array helpers the interpreter uses.
+    """
+
+    def __init__(self, natives: Dict[str, object]):
+        self.natives = natives
+        self.constants: Dict[str, object] = {}
+        self.hoisted: List[str] = []
+        self.lines: List[str] = []
+        self.indent = 1
+        self.level = 0
+        self.temps = 0
+        self.globals: Set[str] = set()
+        self.nonlocals: Set[str] = set()
+        self.direct: Dict[str, int] = {}
+        self.direct_natives: Dict[str, int] = {}
+
+    def transpile(self, statements: List[Statement]) -> str:
+        self.find_direct_calls(statements)
+        self.lines = []
+        self.statements(statements)
+        body = self.lines
+        out = []
+        for function in self.hoisted:
+            out.append(function)
+            out.append("")
+        out.append("def _main():")
+        if self.globals:
+            out.append(f"    global {', '.join(sorted(self.globals))}")
+        out.extend(body or ["    pass"])
+        return "\n".join(out) + "\n"
+
+    def find_direct_calls(self, statements: List[Statement]):
+        bindings = Counter()
+        functions = {}
+        for statement in statements:
+            for node in walk(statement):
+                if isinstance(node, (Var, Function)) and node.depth is None:
+                    bindings[node.name.lexeme] += 1
+                    if isinstance(node, Function):
+                        functions[node.name.lexeme] = node
+                elif (isinstance(node, Assignment) and isinstance(node.target, Token)
+                      and node.depth is None):
+                    bindings[node.target.lexeme] += 1
+        for name, function in functions.items():
+            # A def shadowing a native only takes effect once it runs
+            if bindings[name] == 1 and name not in self.natives:
+                self.direct[name] = len(function.parameters)
+        for name, native in self.natives.items():
+            if bindings[name] == 0 and isinstance(native, Callable):
+                self.direct_natives[name] = native.arity()
+
+    # Emission helpers
+
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def constant(self, value: object) -> str:
+        name = f"_k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def local(self, name: str, depth: int, slot: int) -> str:
+        # The slot keeps names unique, so \res can just lose its backslash
+        name = name.lstrip("\\")
+        return f"l{self.level - depth}_{slot}_{name}"
+
+    def target(self, name: str, depth: Optional[int], slot: Optional[int]) -> str:
+        """Python name for a write, declaring it global/nonlocal as needed."""
+        if depth is None:
+            self.globals.add(f"v_{name}")
+            return f"v_{name}"
+        if depth > 0:
+            self.nonlocals.add(self.local(name, depth, slot))
+        return self.local(name, depth, slot)
+
+    def statements(self, statements: List[Optional[Statement]]):
+        for statement in statements:
+            if statement is not None:
+                self.exec(statement)
+
+    def block(self, statements: List[Optional[Statement]]):
+        self.indent += 1
+        start = len(self.lines)
+        self.statements(statements)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.indent -= 1
+
+    def is_simple(self, expr: Expression) -> bool:
+        return isinstance(expr, (Literal, Variable))
+
+    def is_int_literal(self, expr: Expression) -> bool:
+        return isinstance(expr, Literal) and type(expr.value) is int
+
+    def operand(self, expr: Expression) -> str:
+        code = self.eval(expr)
+        return code if self.is_simple(expr) else f"({code})"
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal) -> str:
+        value = literal.value
+        if value is None or isinstance(value, (bool, int, str)):
+            return repr(value)
+        if isinstance(value, float) and math.isfinite(value):
+            return repr(value)
+        return self.constant(value)
+
+    def visit_grouping(self, grouping: Grouping) -> str:
+        return self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary) -> str:
+        right = self.eval(unary.right)
+        if unary.op.type == TokenType.BANG:
+            return f"(not {right})"
+        if unary.op.type == TokenType.MINUS:
+            return f"(-1 * {right})"
+        return f"({right}, None)[1]"
+
+    def visit_array(self, array: Array) -> str:
+        return f"[{', '.join(self.eval(element) for element in array.elements)}]"
+
+    def visit_constant_array(self, constant_array: ConstantArray) -> str:
+        return f"{self.constant(constant_array.build)}()"
+
+    def visit_array_access(self, array_access: ArrayAccess) -> str:
+        array = self.eval(array_access.array)
+        index = self.eval(array_access.index)
+        line = array_access.bracket.line
+        if not self.is_simple(array_access.index):
+            return f"_get_item({array}, {index}, {line})"
+        t = self.temp()
+        if array_access.safe:
+            return (f"({t}[{index}] if len({t} := {array}) > {index} >= 0 "
+                    f"else _get_item({t}, {index}, {line}))")
+        index_check = "" if self.is_int_literal(array_access.index) else f"type({index}) is int and "
+        return (f"({t}[{index}] if type({t} := {array}) is list and {index_check}"
+                f"0 <= {index} < len({t}) else _get_item({t}, {index}, {line}))")
+
+    def visit_call(self, call: Call) -> str:
+        args = [self.eval(arg) for arg in call.args]
+        callee = call.callee
+        if isinstance(callee, Variable) and callee.depth is None:
+            name = callee.name.lexeme
+            if self.direct.get(name) == len(args):
+                return f"f_{name}({', '.join(args)})"
+            if self.direct_natives.get(name) == len(args):
+                return f"n_{name}(_rt, [{', '.join(args)}])"
+        return f"_call({', '.join([self.eval(callee), str(call.paren.line)] + args)})"
+
+    def visit_binary(self, binary: Binary) -> str:
+        op = self.constant(binary.op)
+        kind = binary.op.type
+        if kind not in OPERATORS:
+            return f"_binary({op}, {self.eval(binary.left)}, {self.eval(binary.right)})"
+
+        symbol = binary.op.lexeme
+        nonzero = " and {right}" if kind in (TokenType.SLASH, TokenType.MOD) else ""
+        if binary.safe and not nonzero:
+            # TypeInference proved the operand types, so nothing is left to check
+            return f"({self.operand(binary.left)} {symbol} {self.operand(binary.right)})"
+        left_int = self.is_int_literal(binary.left)
+        right_int = self.is_int_literal(binary.right)
+
+        if self.is_simple(binary.left) and self.is_simple(binary.right):
+            left = self.eval(binary.left)
+            right = self.eval(binary.right)
+            if left_int and right_int:
+                check = "True"
+            elif left_int:
+                check = f"type({right}) is int"
+            elif right_int:
+                check = f"type({left}) is int"
+            else:
+                check = f"type({left}) is type({right}) is int"
+        else:
+            left, right = self.temp(), self.temp()
+            check = (f"type({left} := {self.eval(binary.left)}) is "
+                     f"type({right} := {self.eval(binary.right)}) is int")
+        check += nonzero.format(right=right)
+        return f"({left} {symbol} {right} if {check} else _binary({op}, {left}, {right}))"
+
+    def visit_logical(self, logical: Logical) -> str:
+        left = self.eval(logical.left)
+        right = self.eval(logical.right)
+        if logical.op.type == TokenType.OR:
+            return f"(True if {left} else bool({right}))"
+        if logical.op.type == TokenType.AND:
+            return f"(bool({right}) if {left} else False)"
+        return f"(bool({left}), bool({right}))[1]"
+
+    def visit_assignment(self, assignment: Assignment) -> str:
+        value = self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            operator = self.constant(assignment.operator)
+            return (f"_store_item({value}, {self.eval(assignment.target.array)}, "
+                    f"{self.eval(assignment.target.index)}, {operator}, "
+                    f"{assignment.target.bracket.line})")
+
+        name = assignment.target.lexeme
+        current = self.load(assignment.target, assignment.depth, assignment.slot)
+        if assignment.operator == TokenType.PLUS_EQUAL:
+            value = f"_add_to({value}, {current})"
+        elif assignment.operator == TokenType.MINUS_EQUAL:
+            value = f"_subtract_from({value}, {current})"
+        if assignment.depth is None:
+            return f"_assign_global({name!r}, {value})"
+        return f"({self.target(name, assignment.depth, assignment.slot)} := {value})"
+
+    def load(self, name: Token, depth: Optional[int], slot: Optional[int]) -> str:
+        if depth is None:
+            return f"v_{name.lexeme}"
+        return self.local(name.lexeme, depth, slot)
+
+    def visit_variable(self, variable: Variable) -> str:
+        return self.load(variable.name, variable.depth, variable.slot)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        expr = expression_stmt.expr
+        if isinstance(expr, Assignment):
+            self.assignment_statement(expr)
+        else:
+            self.emit(self.eval(expr))
+
+    def assignment_statement(self, assignment: Assignment):
+        if isinstance(assignment.target, ArrayAccess):
+            access = assignment.target
+            if not (self.is_simple(access.array) and self.is_simple(access.index)):
+                self.emit(self.eval(assignment))
+                return
+            value = self.temp()
+            array = self.eval(access.array)
+            index = self.eval(access.index)
+            index_check = "" if self.is_int_literal(access.index) else f"type({index}) is int and "
+            self.emit(f"{value} = {self.eval(assignment.value)}")
+            self.emit(f"if type({array}) is list and {index_check}0 <= {index} < len({array}):")
+            if assignment.operator == TokenType.PLUS_EQUAL:
+                self.emit(f"    {array}[{index}] = {array}[{index}] + {value}")
+            elif assignment.operator == TokenType.MINUS_EQUAL:
+                self.emit(f"    {array}[{index}] = {array}[{index}] - {value}")
+            else:
+                self.emit(f"    {array}[{index}] = {value}")
+            self.emit("else:")
+            self.emit(f"    _store_item({value}, {array}, {index}, "
+                      f"{self.constant(assignment.operator)}, {access.bracket.line})")
+            return
+
+        if assignment.depth is None or assignment.operator == TokenType.EQUAL:
+            self.emit(self.eval(assignment))
+            return
+
+        # x += v reads x after evaluating v, which only matters if v can
+        # have side effects
+        name = assignment.target.lexeme
+        current = self.load(assignment.target, assignment.depth, assignment.slot)
+        value = self.eval(assignment.value)
+        target = self.target(name, assignment.depth, assignment.slot)
+        symbol = "+" if assignment.operator == TokenType.PLUS_EQUAL else "-"
+        if self.is_simple(assignment.value):
+            self.emit(f"{target} = {current} {symbol} {value}")
+        else:
+            helper = "_add_to" if symbol == "+" else "_subtract_from"
+            self.emit(f"{target} = {helper}({value}, {current})")
+
+    def visit_var(self, var: Var):
+        value = self.eval(var.initializer) if var.initializer is not None else "None"
+        self.emit(f"{self.target(var.name.lexeme, var.depth, var.slot)} = {value}")
+
+    def visit_block(self, block: Block, new_env=None):
+        self.statements(block.statements)
+
+    def visit_function(self, function: Function):
+        name = function.name.lexeme
+        hoist = function.depth is None
+        fn = f"_impl{len(self.hoisted)}_{name}" if hoist else self.local(name, 0, function.slot)
+
+        saved = (self.lines, self.indent, self.globals, self.nonlocals)
+        self.lines, self.indent = [], 1
+        self.globals, self.nonlocals = set(), set()
+        self.level += 1
+        params = [self.local(param.lexeme, 0, i) for i, param in enumerate(function.parameters)]
+        self.statements(function.body.statements)
+        self.level -= 1
+        header = [f"def {fn}({', '.join(params)}):"]
+        if self.globals:
+            header.append(f"    global {', '.join(sorted(self.globals))}")
+        if self.nonlocals:
+            header.append(f"    nonlocal {', '.join(sorted(self.nonlocals))}")
+        source = header + (self.lines or ["    pass"])
+        self.lines, self.indent, self.globals, self.nonlocals = saved
+
+        if hoist:
+            # Top-level functions cannot see script locals, so they can live
+            # at module level and be bound when the def statement runs
+            self.hoisted.append("\n".join(source))
+            if name in self.direct:
+                self.globals.add(f"f_{name}")
+                self.emit(f"f_{name} = {fn}")
+            self.emit(f"{self.target(name, None, None)} = _function({fn}, {name!r}, "
+                      f"{len(params)}, {self.constant(function)})")
+        else:
+            for line in source:
+                self.emit(line)
+            self.emit(f"{fn} = _function({fn}, {name!r}, {len(params)}, "
+                      f"{self.constant(function)})")
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.emit(f"if {self.eval(if_stmt.condition)}:")
+        self.block([if_stmt.then_stmt])
+        else_stmt = if_stmt.else_stmt
+        while isinstance(else_stmt, IfStatement):
+            self.emit(f"elif {self.eval(else_stmt.condition)}:")
+            self.block([else_stmt.then_stmt])
+            else_stmt = else_stmt.else_stmt
+        if else_stmt is not None:
+            self.emit("else:")
+            self.block([else_stmt])
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        self.emit(f"while {self.eval(while_stmt.condition)}:")
+        self.block([while_stmt.body])
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        iterator = for_stmt.iterator
+        if (isinstance(iterator, Call) and isinstance(iterator.callee, Variable)
+                and iterator.callee.depth is None and iterator.callee.name.lexeme == "range"
+                and self.direct_natives.get("range") == len(iterator.args) == 2):
+            # The range is never seen by the program, so this is CPython's
+            # own counted loop
+            source = f"range({', '.join(self.eval(arg) for arg in iterator.args)})"
+        else:
+            source = self.eval(iterator)
+        self.emit(f"for {self.local(for_stmt.name.lexeme, 0, for_stmt.slot)} in {source}:")
+        self.block([for_stmt.body])
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if return_stmt.expr is None:
+            self.emit("return None")
+        else:
+            self.emit(f"return {self.eval(return_stmt.expr)}")
+
+    def eval(self, expr: Expression) -> str:
+        return expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
+
+
+def transpile(statements: List[Statement], natives: Optional[Dict[str, object]] = None) -> str:
+    """Python source for a resolved program; running it calls _main()."""
+    if natives is None:
+        env = Environment()
+        define_natives(env)
+        natives = env.values
+    return Transpiler(natives).transpile(statements)
+
+
+class PythonRuntime:
+    """Runs resolved programs as transpiled, compile()d Python code."""
+
+    engine = "python"
+
+    def __init__(self):
+        self.env = Environment()
+        define_natives(self.env)
+        self.console = Console()
+        # Evaluations so far of each sampled contract check; see compiler.contracts
+        self.samples: Dict[object, int] = {}
+        # The namespace of the last program compiled
+        self.module: Dict[str, object] = {}
+
+    def compile(self, statements: List[Statement], filename: str = "<py0>"):
+        return self.load(*self.translate(statements, filename))
+
+    def translate(self, statements: List[Statement], filename: str = "<py0>"):
+        """The program's code object and the constants it refers to, which
+        any PythonRuntime can load."""
+        transpiler = Transpiler(self.env.values)
+        source = transpiler.transpile(statements)
+        return compile(source, filename, "exec"), transpiler.constants
+
+    def load(self, code, constants: Dict[str, object]):
+        namespace = self.namespace()
+        namespace.update(constants)
+        exec(code, namespace)
+        self.module = namespace
+        return namespace["_main"]
+
+    def run(self, statements: List[Statement]) -> object:
+        return self.start(self.compile(statements))
+
+    def start(self, main) -> object:
+        try:
+            return main()
+        except NameError as e:
+            raise undefined(e)
+        finally:
+            self.console.flush()
+
+    def lookup_global(self, name: str) -> object:
+        return self.module[f"v_{name}"]
+
+    def namespace(self) -> Dict[str, object]:
+        runtime = self
+        namespace = {"__builtins__": __builtins__, "_rt": runtime}
+        for name, value in self.env.values.items():
+            namespace[f"v_{name}"] = value
+            if isinstance(value, Callable):
+                namespace[f"n_{name}"] = value.call
+
+        def call(callee, line, *args):
+            if type(callee) is TranspiledFunction:
+                if len(args) != callee.nparams:
+                    error(line, f"Expected {callee.nparams} arguments but received {len(args)}.")
+                return callee.fn(*args)
+            if not isinstance(callee, Callable):
+                error(line, "Can only invoke functions or classes")
+            if len(args) != callee.arity():
+                error(line, f"Expected {callee.arity()} arguments but received {len(args)}.")
+            return callee.call(runtime, list(args))
+
+        def assign_global(name, value):
+            if f"v_{name}" not in namespace:
+                raise RuntimeError(f"Variable {name} not defined")
+            namespace[f"v_{name}"] = value
+            return value
+
+        namespace.update({
+            "_call": call,
+            "_binary": binary,
+            "_get_item": get_item,
+            "_store_item": lambda value, array, index, op, line: set_item(
+                array, index, value, op, line),
+            "_add_to": lambda value, current: current + value,
+            "_subtract_from": lambda value, current: current - value,
+            "_assign_global": assign_global,
+            "_function": TranspiledFunction,
+        })
+        return namespace
@@ -0,0 +1,288 @@
+from parser.environment import Environment
+from parser.grammar.functions import Callable
+from typing import Dict
+
+from compiler.bytecode import CodeObject
+from interpreter.arrays import get_item, set_item
+from interpreter.console import Console
+from interpreter.natives import define_natives
+from interpreter.typecheck import checkzero, typecheck
+from util.errors import error
+
+_DONE = object()
+
+# py0 calls never nest Python frames in the VM, so recursion is limited only
+# by this many frames on the VM's own call stack
+MAX_DEPTH = 100_000
+
+
+class VMFunction(Callable):
+    def __init__(self, code: CodeObject, outer: tuple):
+        self.code = code
+        self.function = code.function
+        # (locals, outer) of the frame the function was declared in
+        self.outer = outer
+
+    def call(self, interpreter, args):
+        local_slots = list(args) + [None] * (self.code.nlocals - len(args))
+        return interpreter.execute(self.code, local_slots, self.outer)
+
+    def arity(self):
+        return self.code.arity
+
+
+class VM:
+    engine = "vm"
+
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.env = Environment()
+        self.max_depth = max_depth
+        define_natives(self.env)
+        self.console = Console()
+        # Evaluations so far of each sampled contract check; see compiler.contracts
+        self.samples: Dict[object, int] = {}
+
+    def run(self, code: CodeObject) -> object:
+        try:
+            return self.execute(code, [None] * code.nlocals, None)
+        finally:
+            self.console.flush()
+
+    def lookup_global(self, name: str) -> object:
+        return self.env.values[name]
+
+    def execute(self, code: CodeObject, local_slots: list, outer) -> object:
+        globals = self.env.values
+        max_depth = self.max_depth
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+
+        instructions = code.code
+        consts = code.consts
+        lines = code.lines
+        base = 0
+        pc = 0
+
+        # Opcodes are spelled as literal ints below: comparing against a
+        # constant is measurably cheaper than loading a module global, and
+        # this chain runs once per instruction. See compiler/bytecode.py.
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == 3:  # LOAD_LOCAL
+                push(local_slots[arg])
+
+            elif op == 0:  # CONST
+                push(consts[arg])
+
+            elif op == 4:  # STORE_LOCAL
+                local_slots[arg] = pop()
+
+            elif op == 5:  # LOAD_GLOBAL
+                try:
+                    push(globals[consts[arg]])
+                except KeyError:
+                    raise RuntimeError(f"Variable {consts[arg]} not defined")
+
+            elif op == 30:  # POP_JUMP_IF_FALSE
+                if not pop():
+                    pc = arg
+
+            elif op == 29:  # JUMP
+                pc = arg
+
+            elif op == 36:  # FOR_ITER
+                item = next(stack[-1], _DONE)
+                if item is _DONE:
+                    pop()
+                    pc = arg
+                else:
+                    local_slots[instructions[pc + 1]] = item
+                    pc += 2
+
+            elif op == 10:  # ADD
+                right = pop()
+                left = stack[-1]
+                if type(left) is not int or type(right) is not int:
+                    typecheck(consts[arg], left, right)
+                stack[-1] = left + right
+
+            elif op == 11:  # SUB
+                right = pop()
+                left = stack[-1]
+                if type(left) is not int or type(right) is not int:
+                    typecheck(consts[arg], left, right)
+                stack[-1] = left - right
+
+            elif op == 20:  # LESS
+                right = pop()
+                left = stack[-1]
+                if type(left) is not int or type(right) is not int:
+                    typecheck(consts[arg], left, right)
+                stack[-1] = left < right
+
+            elif op == 33:  # INDEX
+                index = pop()
+                array = stack[-1]
+                if type(array) is list and type(index) is int and 0 <= index < len(array):
+                    stack[-1] = array[index]
+                else:
+                    stack[-1] = get_item(array, index, lines[pc // 2 - 1])
+
+            elif op == 37 or op == 41:  # CALL, TAIL_CALL
+                callee = stack[-arg - 1]
+                if type(callee) is VMFunction:
+                    callee_code = callee.code
+                    if arg != callee_code.arity:
+                        error(lines[pc // 2 - 1],
+                              f"Expected {callee_code.arity} arguments but received {arg}.")
+                    callee_slots = stack[len(stack) - arg:]
+                    if callee_code.nlocals > arg:
+                        callee_slots += [None] * (callee_code.nlocals - arg)
+                    if op == 37:
+                        if len(frames) >= max_depth:
+                            error(lines[pc // 2 - 1], "Maximum recursion depth exceeded")
+                        del stack[-arg - 1:]
+                        frames.append((instructions, consts, lines, pc,
+                                       local_slots, outer, base))
+                        base = len(stack)
+                    else:
+                        # Reuse the caller's frame: its RETURN would only
+                        # have handed the callee's value straight back
+                        del stack[base:]
+                    instructions = callee_code.code
+                    consts = callee_code.consts
+                    lines = callee_code.lines
+                    local_slots = callee_slots
+                    outer = callee.outer
+                    pc = 0
+                else:
+                    args = stack[len(stack) - arg:]
+                    del stack[-arg - 1:]
+                    if not isinstance(callee, Callable):
+                        error(lines[pc // 2 - 1],
+                              "Can only invoke functions or classes")
+                    if arg != callee.arity():
+                        error(lines[pc // 2 - 1],
+                              f"Expected {callee.arity()} arguments but received {arg}.")
+                    push(callee.call(self, args))
+
+            elif op == 38:  # RETURN
+                value = pop()
+                if not frames:
+                    return value
+                del stack[base:]
+                (instructions, consts, lines, pc,
+                 local_slots, outer, base) = frames.pop()
+                push(value)
+
+            elif op == 27:  # INPLACE_ADD
+                current = pop()
+                stack[-1] = current + stack[-1]
+
+            elif op == 6:  # STORE_GLOBAL
+                name = consts[arg]
+                if name not in globals:
+                    raise RuntimeError(f"Variable {name} not defined")
+                globals[name] = pop()
+
+            elif op == 1:  # POP
+                pop()
+
+            elif op == 2:  # DUP
+                push(stack[-1])
+
+            elif op == 35:  # GET_ITER
+                stack[-1] = iter(stack[-1])
+
+            elif op == 28:  # INPLACE_SUB
+                current = pop()
+                stack[-1] = current - stack[-1]
+
+            elif 10 <= op <= 23:  # binary operators
+                right = pop()
+                left = stack[-1]
+                token = consts[arg]
+                if type(left) is not int or type(right) is not int:
+                    typecheck(token, left, right)
+                if op == 12:  # MUL
+                    stack[-1] = left * right
+                elif op == 13:  # DIV
+                    checkzero(token, right)
+                    stack[-1] = left / right
+                elif op == 14:  # MOD
+                    checkzero(token, right)
+                    stack[-1] = left % right
+                elif op == 15:  # BAND
+                    stack[-1] = left & right
+                elif op == 16:  # BOR
+                    stack[-1] = left | right
+                elif op == 17:  # BXOR
+                    stack[-1] = left ^ right
+                elif op == 18:  # GREATER
+                    stack[-1] = left > right
+                elif op == 19:  # GREATER_EQUAL
+                    stack[-1] = left >= right
+                elif op == 21:  # LESS_EQUAL
+                    stack[-1] = left <= right
+                elif op == 22:  # EQUAL
+                    stack[-1] = left == right
+                elif op == 23:  # NOT_EQUAL
+                    stack[-1] = left != right
+
+            elif op == 31:  # POP_JUMP_IF_TRUE
+                if pop():
+                    pc = arg
+
+            elif op == 24:  # NOT
+                stack[-1] = not stack[-1]
+
+            elif op == 25:  # NEGATE
+                stack[-1] = -1 * stack[-1]
+
+            elif op == 26:  # TO_BOOL
+                stack[-1] = bool(stack[-1])
+
+            elif op == 7:  # DEFINE_GLOBAL
+                globals[consts[arg]] = pop()
+
+            elif op == 8:  # LOAD_OUTER
+                depth, slot = consts[arg]
+                frame = outer
+                for _ in range(depth - 1):
+                    frame = frame[1]
+                push(frame[0][slot])
+
+            elif op == 9:  # STORE_OUTER
+                depth, slot = consts[arg]
+                frame = outer
+                for _ in range(depth - 1):
+                    frame = frame[1]
+                frame[0][slot] = pop()
+
+            elif op == 32:  # BUILD_ARRAY
+                if arg:
+                    elements = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    elements = []
+                push(elements)
+
+            elif op == 34:  # STORE_INDEX
+                index = pop()
+                array = pop()
+                stack[-1] = set_item(array, index, stack[-1], consts[arg],
+                                     lines[pc // 2 - 1])
+
+            elif op == 39:  # FUNCTION
+                push(VMFunction(consts[arg], (local_slots, outer)))
+
+            elif op == 40:  # CONST_ARRAY
+                push(consts[arg].build())
+
+            else:
+                raise RuntimeError(f"Unknown opcode {op}")
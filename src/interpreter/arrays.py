@@ -0,0 +1,128 @@
+from array import array as TypedArray
+
+from lexer.tokens import TokenType
+from util.errors import error
+
+
+class Range:
+    """
+    What range() returns: the list of ints from start up to end, without
+    storing them. Iterating, indexing and len() read the range itself;
+    storing an element turns it into that list for good. Printing, +, *
+    and comparisons treat it as the list, so programs can't tell it from
+    one.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, start: int, end: int):
+        self.values = range(start, end)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __setitem__(self, index, value):
+        if type(self.values) is range:
+            self.values = list(self.values)
+        self.values[index] = value
+
+    def tolist(self) -> list:
+        return list(self.values)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    @staticmethod
+    def as_list(other):
+        """other as a list, or None if a list wouldn't take it."""
+        if type(other) is Range:
+            return other.tolist()
+        return other if isinstance(other, list) else None
+
+    def __add__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() + other
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return other + self.tolist()
+
+    def __mul__(self, times):
+        if type(times) is not int and type(times) is not bool:
+            return NotImplemented
+        return self.tolist() * times
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() == other
+
+    def __lt__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() < other
+
+    def __le__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() <= other
+
+    def __gt__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() > other
+
+    def __ge__(self, other):
+        other = self.as_list(other)
+        return NotImplemented if other is None else self.tolist() >= other
+
+    __hash__ = None
+
+
+# Values that can be indexed. Typed arrays keep int or float elements
+# unboxed, 8 bytes each.
+READABLE = (list, Range, range, TypedArray)
+WRITABLE = (list, Range, TypedArray)
+
+TYPECODES = {int: "q", float: "d"}
+ELEMENTS = {"q": "int", "d": "float"}
+
+
+def typed_array(element: type, values) -> TypedArray:
+    try:
+        return TypedArray(TYPECODES[element], values)
+    except (TypeError, OverflowError):
+        raise RuntimeError(f"{element.__name__} arrays can only hold {element.__name__} values")
+
+
+def check_index(array: object, index: object, line: int, message: str, types=READABLE):
+    if not isinstance(array, types):
+        error(line, message)
+    if not isinstance(index, int):
+        error(line, "Array index must be an integer")
+    if index < 0 or index >= len(array):
+        error(line, "Array index out of bounds")
+
+
+def get_item(array: object, index: object, line: int) -> object:
+    check_index(array, index, line, "Array access on non-array")
+    return array[index]
+
+
+def set_item(array: object, index: object, value: object, operator: TokenType, line: int) -> object:
+    check_index(array, index, line, "Cannot assign to non-array", WRITABLE)
+    if operator == TokenType.PLUS_EQUAL:
+        value = array[index] + value
+    elif operator == TokenType.MINUS_EQUAL:
+        value = array[index] - value
+    try:
+        array[index] = value
+    except (TypeError, OverflowError):
+        # Only typed arrays refuse values
+        error(line, f"Cannot store {type(value).__name__} in {ELEMENTS[array.typecode]} array")
+    return value
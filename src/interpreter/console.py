@@ -0,0 +1,90 @@
+import os
+import stat
+import sys
+from typing import List
+
+# Output is handed to stdout once this many characters are waiting
+BUFFER_SIZE = 1 << 16
+
+
+def is_terminal(stream) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError, OSError):
+        return False
+
+
+def is_file(stream) -> bool:
+    """Whether stream reads a regular file, or memory: nobody on the other
+    end could be waiting for our output before writing more."""
+    try:
+        return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+    except AttributeError:
+        return False
+    except (ValueError, OSError):
+        # No file descriptor: a StringIO or the like
+        return True
+
+
+class Console:
+    """
+    The stdin and stdout a runtime's I/O natives use. None stands for the
+    process's own, looked up whenever they're used, so redirecting
+    sys.stdin or sys.stdout still reaches a runtime using the default.
+
+    Output is kept back until BUFFER_SIZE characters are waiting, the
+    program calls flush() or the runtime returns. A terminal still sees
+    every write at once, and before reading from anything but a file the
+    output so far is written, in case the other end is waiting on it.
+    """
+
+    def __init__(self, stdin=None, stdout=None):
+        self.stdin = stdin
+        self.stdout = stdout
+        self.pending: List[str] = []
+        self.size = 0
+        # How much may be pending; decided by the first write after a flush
+        self.limit = BUFFER_SIZE
+        # The stream last read from, and whether that was a file
+        self.source = None
+        self.from_file = True
+
+    def output(self):
+        return sys.stdout if self.stdout is None else self.stdout
+
+    def write(self, text: str):
+        if not self.pending:
+            self.limit = 0 if is_terminal(self.output()) else BUFFER_SIZE
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.flush()
+
+    def print(self, value: object):
+        self.write(f"{value}\n")
+
+    def flush(self):
+        stdout = self.output()
+        if self.pending:
+            stdout.write("".join(self.pending))
+            self.pending = []
+            self.size = 0
+        stdout.flush()
+
+    def reader(self):
+        stdin = sys.stdin if self.stdin is None else self.stdin
+        if stdin is not self.source:
+            self.source = stdin
+            self.from_file = is_file(stdin)
+        if self.pending and not self.from_file:
+            self.flush()
+        return stdin
+
+    def input(self) -> str:
+        line = self.reader().readline()
+        if not line:
+            raise EOFError("EOF when reading a line")
+        return line[:-1] if line.endswith("\n") else line
+
+    def read_all(self) -> str:
+        return self.reader().read()
@@ -1,10 +1,11 @@
-from parser.environment import Environment
+from parser.environment import Environment, Frame
 from parser.grammar.expression import (
     Array,
     ArrayAccess,
     Assignment,
     Binary,
     Call,
+    ConstantArray,
     Expression,
     Grouping,
     Literal,
@@ -12,7 +13,7 @@ from parser.grammar.expression import (
     Unary,
     Variable,
 )
-from parser.grammar.functions import Callable, FunctionCallable, ReturnException
+from parser.grammar.functions import Callable, FunctionCallable
 from parser.grammar.statements import (
     ExpressionStatement,
     ForStatement,
@@ -22,8 +23,11 @@ from parser.grammar.statements import (
     Var,
     WhileStatement,
 )
-from typing import List
+from typing import Dict, List, Optional
 
+from interpreter.arrays import get_item, set_item
+from interpreter.console import Console
+from interpreter.memo import Memo
 from interpreter.natives import define_natives
 from interpreter.typecheck import checkzero, typecheck
 from lexer.tokens import Token, TokenType
@@ -32,13 +36,43 @@ from util.visitor import ExpressionVisitor, StatementVisitor
 
 
 class Interpreter(ExpressionVisitor, StatementVisitor):
-    def __init__(self):
+    engine = "tree"
+
+    def __init__(self, memo: Optional[Memo] = None):
         self.env = Environment()
         define_natives(self.env)
+        self.console = Console()
+        # Evaluations so far of each sampled contract check; see compiler.contracts
+        self.samples: Dict[object, int] = {}
+        self.globals = self.env.values
+        self.frame = Frame([])
+        # Set when pure functions are memoized; see compiler.purity
+        self.memo = memo
 
-    def interpret(self, statements: List[Statement]):
-        for statement in statements:
-            self.exec(statement)
+    def interpret(self, statements: List[Statement], slots: int = 0):
+        # slots is the script frame size reported by the Resolver
+        values = self.frame.values
+        if len(values) < slots:
+            values.extend([None] * (slots - len(values)))
+        try:
+            for statement in statements:
+                if self.exec(statement) is not None:
+                    return
+        finally:
+            self.console.flush()
+
+    def invoke(self, function, frame: Frame) -> object:
+        # Statements return None to fall through or a 1-tuple holding the
+        # value of a return statement, so returning never raises
+        old_frame = self.frame
+        self.frame = frame
+        try:
+            for statement in function.body.statements:
+                signal = statement.accept(self)
+                if signal is not None:
+                    return signal[0]
+        finally:
+            self.frame = old_frame
 
     def visit_literal(self, literal: Literal) -> object:
         return literal.value
@@ -56,35 +90,58 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
     def visit_array(self, array: Array):
         return [self.eval(expr) for expr in array.elements]
 
+    def visit_constant_array(self, constant_array: ConstantArray):
+        return constant_array.build()
+
     def visit_array_access(self, array_access: ArrayAccess):
         array = self.eval(array_access.array)
         index = self.eval(array_access.index)
-        if not isinstance(array, list):
-            error(array_access.bracket.line, "Array access on non-array")
-        if not isinstance(index, int):
-            error(array_access.bracket.line, "Array index must be an integer")
-        if index < 0 or index >= len(array):
-            error(array_access.bracket.line, "Array index out of bounds")
-        return array[index]
+        # Types proven ahead of time leave only the bounds to check
+        if array_access.safe and 0 <= index < len(array):
+            return array[index]
+        return get_item(array, index, array_access.bracket.line)
 
     def visit_call(self, call: Call) -> object:
-        callee = self.eval(call.callee)
-        args = []
-        for arg in call.args:
-            args.append(self.eval(arg))
-        if not isinstance(callee, Callable):
-            error(call.paren.line, "Can only invoke functions or classes")
-        func = callee
-        if len(args) != func.arity():
-            error(call.paren.line,
-                  f"Expected {func.arity()} arguments but received {len(args)}.")
-        return func.call(self, args)
+        cached = call.cached
+        if cached[0] == self.env.version:
+            callee = cached[1]
+        else:
+            callee = self.eval(call.callee)
+            if type(callee) is not FunctionCallable or callee.function is not call.target:
+                return self.call_uncached(call, callee)
+
+        if type(callee) is FunctionCallable:
+            values = [self.eval(arg) for arg in call.args]
+            values += callee.padding
+            return self.invoke(callee.function, Frame(values, callee.closure))
+        return callee.call(self, [self.eval(arg) for arg in call.args])
+
+    def call_uncached(self, call: Call, callee: object) -> object:
+        version = None
+        if isinstance(call.callee, Variable) and call.callee.depth is None:
+            # Watch the name before the arguments run, so rebinding it from
+            # inside them invalidates what gets cached below
+            self.env.watch(call.callee.name.lexeme)
+            version = self.env.version
+
+        args = [self.eval(arg) for arg in call.args]
+        if callee is not call.target:
+            if not isinstance(callee, Callable):
+                error(call.paren.line, "Can only invoke functions or classes")
+            if len(args) != callee.arity():
+                error(call.paren.line,
+                      f"Expected {callee.arity()} arguments but received {len(args)}.")
+            call.target = callee.function if type(callee) is FunctionCallable else callee
+        if version is not None:
+            call.cached = (version, callee)
+        return callee.call(self, args)
 
     def visit_binary(self, binary: Binary) -> object:
         op = binary.op
         left = self.eval(binary.left)
         right = self.eval(binary.right)
-        typecheck(op, left, right)
+        if not binary.safe:
+            typecheck(op, left, right)
         if op.type == TokenType.PLUS:
             return left + right
         elif op.type == TokenType.MINUS:
@@ -130,107 +187,111 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
         # Handle compound assignment for variables
         if isinstance(assignment.target, Token):
             if assignment.operator == TokenType.PLUS_EQUAL:
-                # Get the current value
-                current_value = self.env.retrive(assignment.target)
-                # Add the new value
-                value = current_value + value
+                value = self.lookup(assignment.target, assignment.depth,
+                                    assignment.slot) + value
             elif assignment.operator == TokenType.MINUS_EQUAL:
-                # Get the current value
-                current_value = self.env.retrive(assignment.target)
-                # Subtract the new value
-                value = current_value - value
+                value = self.lookup(assignment.target, assignment.depth,
+                                    assignment.slot) - value
 
             # Assign the final value
-            self.env.assign(assignment.target.lexeme, value)
+            if assignment.depth is None:
+                self.env.assign(assignment.target.lexeme, value)
+            else:
+                self.frame.ancestor(assignment.depth).values[assignment.slot] = value
 
         # Handle compound assignment for array elements
         elif isinstance(assignment.target, ArrayAccess):
             array = self.eval(assignment.target.array)
             index = self.eval(assignment.target.index)
-
-            if not isinstance(array, list):
-                error(assignment.target.bracket.line,
-                      "Cannot assign to non-array")
-            if not isinstance(index, int):
-                error(assignment.target.bracket.line,
-                      "Array index must be an integer")
-            if index < 0 or index >= len(array):
-                error(assignment.target.bracket.line,
-                      "Array index out of bounds")
-
-            if assignment.operator == TokenType.PLUS_EQUAL:
-                # Get the current value
-                current_value = array[index]
-                # Add the new value
-                value = current_value + value
-            elif assignment.operator == TokenType.MINUS_EQUAL:
-                # Get the current value
-                current_value = array[index]
-                # Subtract the new value
-                value = current_value - value
-
-            array[index] = value
+            value = set_item(array, index, value, assignment.operator,
+                             assignment.target.bracket.line)
         else:
             error(0, "Invalid assignment target")
 
         return value
 
     def visit_variable(self, variable: Variable):
-        return self.env.retrive(variable.name)
+        if variable.depth == 0:
+            return self.frame.values[variable.slot]
+        return self.lookup(variable.name, variable.depth, variable.slot)
+
+    def lookup_global(self, name: str) -> object:
+        return self.globals[name]
+
+    def lookup(self, name: Token, depth: Optional[int], slot: Optional[int]) -> object:
+        if depth is None:
+            try:
+                return self.globals[name.lexeme]
+            except KeyError:
+                raise RuntimeError(f"Variable {name.lexeme} not defined")
+        return self.frame.ancestor(depth).values[slot]
 
     def visit_expression_statement(self, expression_stmt: ExpressionStatement):
-        return self.eval(expression_stmt.expr)
+        self.eval(expression_stmt.expr)
 
     def visit_var(self, var: Var):
         value = None
         if var.initializer is not None:
             value = self.eval(var.initializer)
-        try:
-            self.env.assign(var.name.lexeme, value)
-        except RuntimeError:
+        if var.depth is None:
             self.env.define(var.name.lexeme, value)
+        else:
+            self.frame.ancestor(var.depth).values[var.slot] = value
 
     def visit_block(self, block, new_env=None):
-        new_env = Environment(self.env) if new_env is None else new_env
-        old_env = self.env
-        self.env = new_env
+        # Blocks share their function's frame; only calls bring a new one
+        if new_env is None:
+            for statement in block.statements:
+                signal = self.exec(statement)
+                if signal is not None:
+                    return signal
+            return
+        old_frame = self.frame
+        self.frame = new_env
         try:
             for statement in block.statements:
-                self.exec(statement)
+                signal = self.exec(statement)
+                if signal is not None:
+                    return signal
         finally:
-            self.env = old_env
+            self.frame = old_frame
 
     def visit_function(self, function):
-        callable = FunctionCallable(function)
-        self.env.define(function.name.lexeme, callable)
+        if self.memo is not None and function.pure:
+            callable = self.memo.callable(function, self.frame)
+        else:
+            callable = FunctionCallable(function, self.frame)
+        if function.depth is None:
+            self.env.define(function.name.lexeme, callable)
+        else:
+            self.frame.values[function.slot] = callable
 
     def visit_if_statement(self, if_stmt: IfStatement):
         if bool(self.eval(if_stmt.condition)):
-            self.exec(if_stmt.then_stmt)
+            return self.exec(if_stmt.then_stmt)
         elif if_stmt.else_stmt is not None:
-            self.exec(if_stmt.else_stmt)
+            return self.exec(if_stmt.else_stmt)
 
     def visit_while_statement(self, while_stmt: WhileStatement):
         while bool(self.eval(while_stmt.condition)):
-            self.exec(while_stmt.body)
+            signal = self.exec(while_stmt.body)
+            if signal is not None:
+                return signal
 
     def visit_for_statement(self, for_stmt: ForStatement):
         iterator = self.eval(for_stmt.iterator)
+        values = self.frame.values
         for item in iterator:
-            env = Environment(self.env)
-            env.define(for_stmt.name.lexeme, item)
-            old_env = self.env
-            self.env = env
-            try:
-                self.exec(for_stmt.body)
-            finally:
-                self.env = old_env
+            values[for_stmt.slot] = item
+            signal = self.exec(for_stmt.body)
+            if signal is not None:
+                return signal
 
     def visit_return_statement(self, return_stmt: ReturnStatement):
         value = None
         if return_stmt.expr is not None:
             value = self.eval(return_stmt.expr)
-        raise ReturnException(value)
+        return (value,)
 
     def eval(self, expr: Expression) -> object:
         return expr.accept(self)
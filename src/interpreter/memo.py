@@ -0,0 +1,71 @@
+import sys
+from collections import OrderedDict
+from parser.environment import Frame
+from parser.grammar.functions import FunctionCallable
+from parser.grammar.statements import Function
+from typing import Dict, List, Optional, TextIO
+
+MEMO_SIZE = 1024
+
+# Results that callers can't mutate, so one copy may be handed to all of them
+IMMUTABLE = (int, float, str, bool, type(None))
+
+
+class Memo:
+    """Results of pure py0 functions, in one bounded LRU cache per function."""
+
+    def __init__(self, size: int = MEMO_SIZE):
+        self.size = size
+        # function name -> [hits, misses, evictions]
+        self.counters: Dict[str, List[int]] = {}
+
+    def callable(self, function: Function, closure: Optional[Frame]) -> FunctionCallable:
+        counters = self.counters.setdefault(function.name.lexeme, [0, 0, 0])
+        return MemoizedCallable(function, closure, self.size, counters)
+
+    def as_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "functions": {name: {"hits": hits, "misses": misses, "evictions": evictions}
+                          for name, (hits, misses, evictions) in self.counters.items()},
+        }
+
+    def report(self, out: TextIO = sys.stderr):
+        for name, (hits, misses, evictions) in self.counters.items():
+            out.write(f"memo {name}: {hits} hits, {misses} misses, {evictions} evictions\n")
+
+
+class MemoizedCallable(FunctionCallable):
+    def __init__(self, function: Function, closure: Optional[Frame], size: int,
+                 counters: List[int]):
+        super().__init__(function, closure)
+        self.size = size
+        self.counters = counters
+        self.results = OrderedDict()
+
+    def call(self, interpreter, args):
+        # Typed keys, so f(1), f(1.0) and f(True) stay apart
+        key = tuple((type(arg), arg) for arg in args)
+        try:
+            result = self.results[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Arrays aren't hashable; calls given one always run
+            return super().call(interpreter, args)
+        else:
+            self.results.move_to_end(key)
+            self.counters[0] += 1
+            return result
+
+        self.counters[1] += 1
+        # Invoked directly rather than through super().call, so memoizing
+        # costs one Python frame per py0 call
+        result = interpreter.invoke(self.function,
+                                    Frame(list(args) + self.padding, self.closure))
+        if type(result) in IMMUTABLE:
+            self.results[key] = result
+            if len(self.results) > self.size:
+                self.results.popitem(last=False)
+                self.counters[2] += 1
+        return result
@@ -1,15 +1,73 @@
 from parser.environment import Environment
 from parser.grammar.functions import Callable
+from typing import Set
+
+from interpreter.arrays import READABLE, Range, TypedArray, typed_array
+from interpreter.parallel import NativePmap
+from interpreter.vectorized import (
+    NativeAdd,
+    NativeDot,
+    NativeMapScale,
+    NativeMax,
+    NativeMin,
+    NativeMul,
+    NativePrefixSum,
+    NativeSum,
+)
 
 
 class NativePrint(Callable):
+    io = True
+
+    def call(self, interpreter, args):
+        value = args[0]
+        if type(value) is TypedArray:
+            value = value.tolist()
+        interpreter.console.print(value)
+
+    def arity(self):
+        return 1
+
+
+class NativeWrite(Callable):
+    """print without the newline."""
+
+    io = True
+
+    def call(self, interpreter, args):
+        value = args[0]
+        if type(value) is TypedArray:
+            value = value.tolist()
+        interpreter.console.write(f"{value}")
+
+    def arity(self):
+        return 1
+
+
+class NativeWriteLines(Callable):
+    io = True
+
     def call(self, interpreter, args):
-        print(args[0])
+        values = args[0]
+        if not isinstance(values, READABLE):
+            raise RuntimeError("write_lines expects an array")
+        if len(values) > 0:
+            interpreter.console.write("\n".join(map(str, values)) + "\n")
 
     def arity(self):
         return 1
 
 
+class NativeFlush(Callable):
+    io = True
+
+    def call(self, interpreter, args):
+        interpreter.console.flush()
+
+    def arity(self):
+        return 0
+
+
 class NativeLen(Callable):
     def call(self, interpreter, args):
         return len(args[0])
@@ -20,33 +78,75 @@ class NativeLen(Callable):
 
 class NativeRange(Callable):
     def call(self, interpreter, args):
+        # Lazy: iterating, indexing and len() never build the list
         start = args[0]
         end = args[1]
-        return list(range(start, end))
+        return Range(start, end)
 
     def arity(self):
         return 2
 
 
 class NativeInput(Callable):
+    io = True
+
     def call(self, interpreter, args):
-        return input()
+        return interpreter.console.input()
 
     def arity(self):
         return 0
 
 
 class NativeInputInt(Callable):
+    io = True
+
     def call(self, interpreter, args):
-        return int(input())
+        return int(interpreter.console.input())
 
     def arity(self):
         return 0
 
 
 class NativeInputFloat(Callable):
+    io = True
+
+    def call(self, interpreter, args):
+        return float(interpreter.console.input())
+
+    def arity(self):
+        return 0
+
+
+class NativeReadAll(Callable):
+    io = True
+
+    def call(self, interpreter, args):
+        return interpreter.console.read_all()
+
+    def arity(self):
+        return 0
+
+
+class NativeReadLines(Callable):
+    io = True
+
+    def call(self, interpreter, args):
+        lines = interpreter.console.read_all().split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        return lines
+
+    def arity(self):
+        return 0
+
+
+class NativeReadInts(Callable):
+    """Every whitespace-separated int left on stdin, as an int array."""
+
+    io = True
+
     def call(self, interpreter, args):
-        return float(input())
+        return typed_array(int, map(int, interpreter.console.read_all().split()))
 
     def arity(self):
         return 0
@@ -87,34 +187,74 @@ class NativeAssert(Callable):
         return 2
 
 
-class NativeRequires(Callable):
+class NativeZeros(Callable):
     def call(self, interpreter, args):
-        if not args[0]:
-            raise Exception(args[1])
+        return typed_array(int, [0]) * args[0]
 
     def arity(self):
-        return 2
+        return 1
 
 
-class NativeEnsures(Callable):
+class NativeFill(Callable):
     def call(self, interpreter, args):
-        if not args[0]:
-            raise Exception(args[1])
+        count, value = args
+        if type(value) not in (int, float):
+            raise RuntimeError("fill value must be an int or float")
+        return typed_array(type(value), [value]) * count
 
     def arity(self):
         return 2
 
 
+class NativeIntArray(Callable):
+    def call(self, interpreter, args):
+        return typed_array(int, args[0])
+
+    def arity(self):
+        return 1
+
+
+class NativeFloatArray(Callable):
+    def call(self, interpreter, args):
+        return typed_array(float, args[0])
+
+    def arity(self):
+        return 1
+
+
 def define_natives(env: Environment):
     env.define("print", NativePrint())
+    env.define("write", NativeWrite())
+    env.define("write_lines", NativeWriteLines())
+    env.define("flush", NativeFlush())
     env.define("len", NativeLen())
     env.define("range", NativeRange())
     env.define("input", NativeInput())
     env.define("input_int", NativeInputInt())
     env.define("input_float", NativeInputFloat())
+    env.define("read_all", NativeReadAll())
+    env.define("read_lines", NativeReadLines())
+    env.define("read_ints", NativeReadInts())
     env.define("parse_int", NativeParseInt())
     env.define("parse_float", NativeParseFloat())
     env.define("split", NativeSplit())
     env.define("assert", NativeAssert())
-    env.define("requires", NativeRequires())
-    env.define("ensures", NativeEnsures())
+    env.define("zeros", NativeZeros())
+    env.define("fill", NativeFill())
+    env.define("int_array", NativeIntArray())
+    env.define("float_array", NativeFloatArray())
+    env.define("sum", NativeSum())
+    env.define("min", NativeMin())
+    env.define("max", NativeMax())
+    env.define("dot", NativeDot())
+    env.define("add", NativeAdd())
+    env.define("mul", NativeMul())
+    env.define("prefix_sum", NativePrefixSum())
+    env.define("map_scale", NativeMapScale())
+    env.define("pmap", NativePmap())
+
+
+def native_names() -> Set[str]:
+    env = Environment()
+    define_natives(env)
+    return set(env.values)
@@ -0,0 +1,381 @@
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from io import BytesIO
+from multiprocessing import shared_memory
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.functions import Callable
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import Dict, List, Optional, Set
+
+from interpreter.arrays import READABLE, TypedArray
+from lexer.tokens import Token
+from util.errors import error
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+# Processes pmap spreads its work over; 1 runs it in the calling process
+WORKERS = os.cpu_count() or 1
+
+# Typed arrays this large go to the workers through shared memory
+# instead of being pickled
+SHARE_BYTES = 1 << 16
+
+# Tasks per worker, so that uneven iterations still balance out
+CHUNKS_PER_WORKER = 4
+
+
+def set_workers(workers: int):
+    global WORKERS
+    WORKERS = workers
+
+
+class GlobalNames(ExpressionVisitor, StatementVisitor):
+    """The globals a function body reads. Assigning one is an error: the
+    assignment would only happen inside a worker."""
+
+    def __init__(self):
+        self.names: Set[str] = set()
+
+    def collect(self, function: Function) -> Set[str]:
+        self.block(function.body.statements)
+        return self.names
+
+    def block(self, statements: List[Statement]):
+        for statement in statements:
+            if statement is not None:
+                self.exec(statement)
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal):
+        pass
+
+    def visit_grouping(self, grouping: Grouping):
+        self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary):
+        self.eval(unary.right)
+
+    def visit_array(self, array: Array):
+        for element in array.elements:
+            self.eval(element)
+
+    def visit_constant_array(self, constant_array: ConstantArray):
+        pass
+
+    def visit_array_access(self, array_access: ArrayAccess):
+        self.eval(array_access.array)
+        self.eval(array_access.index)
+
+    def visit_call(self, call: Call):
+        self.eval(call.callee)
+        for arg in call.args:
+            self.eval(arg)
+
+    def visit_binary(self, binary: Binary):
+        self.eval(binary.left)
+        self.eval(binary.right)
+
+    def visit_logical(self, logical: Logical):
+        self.eval(logical.left)
+        self.eval(logical.right)
+
+    def visit_assignment(self, assignment: Assignment):
+        self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            self.eval(assignment.target)
+        elif assignment.depth is None:
+            target = assignment.target
+            error(target.line, f"pmap function can't assign global '{target.lexeme}'")
+
+    def visit_variable(self, variable: Variable):
+        if variable.depth is None:
+            self.names.add(variable.name.lexeme)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        self.eval(expression_stmt.expr)
+
+    def visit_var(self, var: Var):
+        if var.initializer is not None:
+            self.eval(var.initializer)
+        if var.depth is None:
+            error(var.name.line, f"pmap function can't assign global '{var.name.lexeme}'")
+
+    def visit_block(self, block: Block, new_env=None):
+        self.block(block.statements)
+
+    def visit_function(self, function: Function):
+        self.block(function.body.statements)
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.eval(if_stmt.condition)
+        self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            self.exec(if_stmt.else_stmt)
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        self.eval(while_stmt.condition)
+        self.exec(while_stmt.body)
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        self.eval(for_stmt.iterator)
+        self.exec(for_stmt.body)
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if return_stmt.expr is not None:
+            self.eval(return_stmt.expr)
+
+    def eval(self, expr: Expression):
+        expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
+
+
+def fresh_call(callee: Expression, paren, args: List[Expression]) -> Call:
+    return Call(callee, paren, args)
+
+
+class ProgramPickler(pickle.Pickler):
+    # Call sites remember the callables they last ran, which belong to the
+    # caller's engine; workers start over with clean ones
+    def reducer_override(self, obj):
+        if type(obj) is Call:
+            return fresh_call, (obj.callee, obj.paren, obj.args)
+        return NotImplemented
+
+
+class SharedArray:
+    """A typed array copied once into shared memory, attached to by name."""
+
+    def __init__(self, array: TypedArray):
+        size = array.itemsize * len(array)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.memory.buf[:size] = array.tobytes()
+        self.name = self.memory.name
+        self.typecode = array.typecode
+        self.length = len(array)
+
+    def __getstate__(self):
+        return {"name": self.name, "typecode": self.typecode, "length": self.length}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memory = None
+
+    def view(self) -> memoryview:
+        """Only meant for workers, which unpickle their own SharedArray."""
+        if self.memory is None:
+            # Workers share the caller's resource tracker, and the caller
+            # unlinks the block once the pool is done
+            self.memory = shared_memory.SharedMemory(name=self.name)
+        return self.memory.buf.cast(self.typecode)[:self.length]
+
+    def copy(self) -> TypedArray:
+        return TypedArray(self.typecode, self.view())
+
+    def release(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def shareable(value: object) -> bool:
+    return type(value) is TypedArray and value.itemsize * len(value) >= SHARE_BYTES
+
+
+class Shipment:
+    """
+    Everything a worker needs to call a top-level py0 function: the
+    declarations of the defs it can reach, and the values of the other
+    globals they read, as they are when pmap is called. It is pickled once
+    per worker; large typed arrays go through shared memory.
+    """
+
+    def __init__(self, interpreter, function: Function):
+        self.engine = interpreter.engine
+        self.name = function.name.lexeme
+        # global name -> declaration of the def bound to it
+        self.functions: Dict[str, Function] = {self.name: function}
+        self.values: Dict[str, object] = {}
+        self.shared: List[SharedArray] = []
+
+        pending = [function]
+        while pending:
+            for name in GlobalNames().collect(pending.pop()):
+                if name in self.functions or name in self.values:
+                    continue
+                try:
+                    value = interpreter.lookup_global(name)
+                except KeyError:
+                    # Left undefined, so the worker fails the way the caller would
+                    continue
+                self.add(name, value, pending)
+
+    def add(self, name: str, value: object, pending: List[Function]):
+        declaration = getattr(value, "function", None)
+        if isinstance(declaration, Function):
+            if declaration.depth is not None:
+                raise RuntimeError(f"pmap can't send '{name}' to workers: it is a nested function")
+            pending.append(declaration)
+            if name != declaration.name.lexeme:
+                # Reached under another name, so the worker declares it under that one
+                declaration = copy(declaration)
+                declaration.name = Token(declaration.name.type, name, None, declaration.name.line)
+            self.functions[name] = declaration
+        elif isinstance(value, Callable) and value.io:
+            raise RuntimeError(f"pmap function can't call {name}: workers have no console")
+        elif shareable(value):
+            array = SharedArray(value)
+            self.shared.append(array)
+            self.values[name] = array
+        else:
+            self.values[name] = value
+
+    def pickle(self) -> bytes:
+        out = BytesIO()
+        try:
+            ProgramPickler(out, pickle.HIGHEST_PROTOCOL).dump(self)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise RuntimeError(f"pmap can't send its function's globals to workers: {e}")
+        return out.getvalue()
+
+    def __getstate__(self):
+        return {"engine": self.engine, "name": self.name,
+                "functions": self.functions, "values": self.values}
+
+    def release(self):
+        for array in self.shared:
+            array.release()
+
+
+# The current worker's (function, runtime, shared input), set up once per process
+_worker = None
+
+
+def start_worker(shipment: bytes, source: Optional[SharedArray]):
+    global _worker
+    shipment = pickle.loads(shipment)
+    runtime = load(shipment)
+    _worker = (runtime.lookup_global(shipment.name), runtime, source)
+
+
+def load(shipment: Shipment):
+    # Imported here: every engine defines the natives, pmap among them
+    from compiler.closures import ClosureCompiler
+    from compiler.compiler import Compiler
+    from compiler.transpiler import PythonRuntime
+    from compiler.vm import VM
+    from interpreter.interpreter import Interpreter
+
+    runtimes = {"tree": Interpreter, "vm": VM, "closure": ClosureCompiler,
+                "python": PythonRuntime}
+    runtime = runtimes[shipment.engine]()
+    for name, value in shipment.values.items():
+        if type(value) is SharedArray:
+            value = value.copy()
+        runtime.env.define(name, value)
+
+    declarations = list(shipment.functions.values())
+    if shipment.engine == "vm":
+        runtime.run(Compiler().compile(declarations))
+    elif shipment.engine == "tree":
+        runtime.interpret(declarations)
+    else:
+        runtime.run(declarations)
+    return runtime
+
+
+def run_chunk(task) -> list:
+    fn, runtime, source = _worker
+    start, end, values = task
+    if values is None:
+        values = source.view()[start:end].tolist()
+    return [fn.call(runtime, [value]) for value in values]
+
+
+class NativePmap(Callable):
+    """
+    pmap(fn, array) is [fn(x) for x in array], computed by a pool of
+    worker processes. fn must be a top-level def; the globals it reads are
+    copied to the workers as they are when pmap is called, so it mustn't
+    assign them, print or read input. With one worker, or fewer than two
+    elements, it is just that loop, run in the calling process.
+    """
+
+    def call(self, interpreter, args):
+        fn, values = args
+        function = getattr(fn, "function", None)
+        if not isinstance(fn, Callable) or not isinstance(function, Function):
+            raise RuntimeError("pmap expects a function")
+        if fn.arity() != 1:
+            raise RuntimeError("pmap expects a function of one argument")
+        if function.depth is not None:
+            raise RuntimeError("pmap expects a top-level function")
+        if not isinstance(values, READABLE):
+            raise RuntimeError("pmap expects an array")
+
+        if WORKERS <= 1 or len(values) < 2:
+            # Nothing leaves this process, so nothing has to be shipped
+            return [fn.call(interpreter, [value]) for value in values]
+        shipment = Shipment(interpreter, function)
+        try:
+            return self.parallel(shipment, values)
+        finally:
+            shipment.release()
+
+    def parallel(self, shipment: Shipment, values) -> list:
+        n = len(values)
+        workers = min(WORKERS, n)
+        chunks = min(n, workers * CHUNKS_PER_WORKER)
+        size = -(-n // chunks)
+
+        source = SharedArray(values) if shareable(values) else None
+        if source is None:
+            tasks = [(start, None, values[start:start + size]) for start in range(0, n, size)]
+        else:
+            tasks = [(start, min(start + size, n), None) for start in range(0, n, size)]
+
+        # Forked workers would otherwise write out whatever is still buffered
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            pool = ProcessPoolExecutor(workers, initializer=start_worker,
+                                       initargs=(shipment.pickle(), source))
+            try:
+                return [result for chunk in pool.map(run_chunk, tasks) for result in chunk]
+            finally:
+                # After a failed chunk the rest are of no use
+                pool.shutdown(cancel_futures=True)
+        finally:
+            if source is not None:
+                source.release()
+
+    def arity(self):
+        return 2
@@ -0,0 +1,207 @@
+import marshal
+import sys
+from collections import defaultdict
+from parser.environment import Frame
+from parser.grammar.expression import Expression
+from parser.grammar.statements import Statement
+from time import perf_counter
+from typing import Dict, List, Optional, TextIO, Tuple
+from weakref import WeakKeyDictionary
+
+from interpreter.interpreter import Interpreter
+from interpreter.memo import Memo
+from lexer.tokens import Token
+
+SCRIPT = ("<script>", 0)
+
+_MISSING = object()
+
+
+def line_of(node: object) -> Optional[int]:
+    """The first source line named by a statement's own tokens, if any."""
+    for value in vars(node).values():
+        if isinstance(value, Token):
+            return value.line
+    for value in vars(node).values():
+        if isinstance(value, Expression):
+            line = line_of(value)
+            if line is not None:
+                return line
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, Expression):
+                    line = line_of(item)
+                    if line is not None:
+                        return line
+    return None
+
+
+class Profiler:
+    """
+    Deterministic profile of one run, per py0 function and per source line.
+
+    Functions are keyed by (name, line of their def). Exclusive time leaves
+    out time spent in callees (or, for lines, in nested statements);
+    inclusive time is only counted for the outermost activation, so
+    recursion is not counted twice.
+    """
+
+    def __init__(self, filename: str = "<py0>"):
+        self.filename = filename
+        # key -> [calls, primitive calls, exclusive, inclusive]
+        self.functions = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        # callee -> caller -> [calls, primitive calls, exclusive, inclusive]
+        self.callers = defaultdict(lambda: defaultdict(lambda: [0, 0, 0.0, 0.0]))
+        # line -> [executions, exclusive, inclusive]
+        self.lines = defaultdict(lambda: [0, 0.0, 0.0])
+        # Call stacks are interned: (parent path, key) -> path id
+        self.paths: Dict[Tuple[int, Tuple[str, int]], int] = {}
+        self.path_keys: List[Tuple[Optional[int], Tuple[str, int]]] = [(None, SCRIPT)]
+        self.stack_times = defaultdict(float)
+
+        self.active = defaultdict(int)
+        self.active_lines = defaultdict(int)
+        # [key, path id, start, time spent in callees]
+        self.calls = [[SCRIPT, 0, perf_counter(), 0.0]]
+        # time spent in nested statements, one entry per running statement
+        self.statements: List[float] = []
+        self.active[SCRIPT] = 1
+
+    def enter(self, key: Tuple[str, int]):
+        parent = self.calls[-1][1]
+        path = self.paths.get((parent, key))
+        if path is None:
+            path = self.paths[(parent, key)] = len(self.path_keys)
+            self.path_keys.append((parent, key))
+        self.active[key] += 1
+        self.calls.append([key, path, perf_counter(), 0.0])
+
+    def leave(self):
+        key, path, start, inner = self.calls.pop()
+        elapsed = perf_counter() - start
+        caller = self.calls[-1]
+        caller[3] += elapsed
+        self.active[key] -= 1
+        primitive = self.active[key] == 0
+
+        for stats in (self.functions[key], self.callers[key][caller[0]]):
+            stats[0] += 1
+            stats[2] += elapsed - inner
+            if primitive:
+                stats[1] += 1
+                stats[3] += elapsed
+        self.stack_times[path] += elapsed - inner
+
+    def enter_line(self, line: int):
+        self.active_lines[line] += 1
+        self.statements.append(0.0)
+
+    def leave_line(self, line: int, elapsed: float):
+        inner = self.statements.pop()
+        if self.statements:
+            self.statements[-1] += elapsed
+        self.active_lines[line] -= 1
+        stats = self.lines[line]
+        stats[0] += 1
+        stats[1] += elapsed - inner
+        if self.active_lines[line] == 0:
+            stats[2] += elapsed
+
+    def stop(self):
+        """Closes every open call, including the script itself."""
+        while len(self.calls) > 1:
+            self.leave()
+        key, path, start, inner = self.calls[0]
+        elapsed = perf_counter() - start
+        stats = self.functions[SCRIPT]
+        stats[0] = stats[1] = 1
+        stats[2] = elapsed - inner
+        stats[3] = elapsed
+        self.stack_times[0] += elapsed - inner
+        self.calls[0] = [SCRIPT, 0, perf_counter(), 0.0]
+
+    # Reports
+
+    def name(self, key: Tuple[str, int]) -> str:
+        return key[0] if key == SCRIPT else f"{key[0]}:{key[1]}"
+
+    def report(self, out: TextIO = sys.stderr, limit: int = 20):
+        out.write(f"{'calls':>10} {'excl (s)':>10} {'incl (s)':>10}  function\n")
+        for key, (calls, _, exclusive, inclusive) in sorted(
+                self.functions.items(), key=lambda item: -item[1][2]):
+            out.write(f"{calls:>10} {exclusive:>10.4f} {inclusive:>10.4f}  {self.name(key)}\n")
+
+        out.write(f"\n{'execs':>10} {'excl (s)':>10} {'incl (s)':>10}  line\n")
+        for line, (count, exclusive, inclusive) in sorted(
+                self.lines.items(), key=lambda item: -item[1][1])[:limit]:
+            out.write(f"{count:>10} {exclusive:>10.4f} {inclusive:>10.4f}  "
+                      f"{self.filename}:{line}\n")
+
+    def dump_stats(self, path: str):
+        """Writes the function profile in the format pstats.Stats loads."""
+        def label(key):
+            return (self.filename, key[1], key[0])
+
+        stats = {}
+        for key, (calls, primitive, exclusive, inclusive) in self.functions.items():
+            callers = {label(caller): tuple(edge)
+                       for caller, edge in self.callers[key].items()}
+            stats[label(key)] = (primitive, calls, exclusive, inclusive, callers)
+        with open(path, "wb") as file:
+            marshal.dump(stats, file)
+
+    def write_collapsed(self, path: str):
+        """Writes exclusive time per call stack, in microseconds, for flamegraph tools."""
+        with open(path, "w") as file:
+            for stack, seconds in sorted(self.stack_times.items()):
+                names = []
+                while stack is not None:
+                    parent, key = self.path_keys[stack]
+                    names.append(self.name(key))
+                    stack = parent
+                micros = round(seconds * 1_000_000)
+                if micros:
+                    file.write(f"{';'.join(reversed(names))} {micros}\n")
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    The tree walker with timing around every call and statement. Only this
+    subclass pays for it; a plain Interpreter is untouched.
+    """
+
+    def __init__(self, profiler: Profiler, memo: Optional[Memo] = None):
+        super().__init__(memo)
+        self.profiler = profiler
+        # Keyed by the statements themselves, weakly: in --stream mode they
+        # are freed once run, and their ids reused by later ones
+        self.lines: WeakKeyDictionary = WeakKeyDictionary()
+
+    def invoke(self, function, frame: Frame) -> object:
+        profiler = self.profiler
+        profiler.enter((function.name.lexeme, function.name.line))
+        old_frame = self.frame
+        self.frame = frame
+        try:
+            for statement in function.body.statements:
+                signal = self.exec(statement)
+                if signal is not None:
+                    return signal[0]
+        finally:
+            self.frame = old_frame
+            profiler.leave()
+
+    def exec(self, statement: Statement):
+        line = self.lines.get(statement, _MISSING)
+        if line is _MISSING:
+            line = self.lines[statement] = line_of(statement)
+        if line is None:
+            return statement.accept(self)
+
+        profiler = self.profiler
+        profiler.enter_line(line)
+        start = perf_counter()
+        try:
+            return statement.accept(self)
+        finally:
+            profiler.leave_line(line, perf_counter() - start)
@@ -0,0 +1,115 @@
+import json
+from collections import Counter
+from contextlib import contextmanager
+from parser.environment import Frame
+from parser.grammar.expression import Assignment, Expression, Variable
+from parser.grammar.statements import Statement
+from time import perf_counter
+from typing import Dict, Iterable, Optional, TextIO
+
+from interpreter.interpreter import Interpreter
+from interpreter.memo import Memo
+from lexer.tokens import Token
+
+
+def count_nodes(nodes: Iterable[object], counts: Optional[Counter] = None) -> Counter:
+    """AST nodes by class name. Count before running: calls remember their targets."""
+    if counts is None:
+        counts = Counter()
+    for node in nodes:
+        if isinstance(node, (Expression, Statement)):
+            counts[type(node).__name__] += 1
+            for value in vars(node).values():
+                if isinstance(value, list):
+                    count_nodes(value, counts)
+                else:
+                    count_nodes((value,), counts)
+    return counts
+
+
+class RunStats:
+    """What one run of a program cost, phase by phase."""
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.phases: Dict[str, float] = {}
+        self.tokens = 0
+        self.nodes = Counter()
+        # Only filled in by the tree engine, see CountingInterpreter
+        self.visits = Counter()
+        self.frames = 0
+        self.lookups = Counter()
+        self.peak_memory: Optional[int] = None
+        self.memo: Optional[Memo] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - start
+
+    def as_dict(self) -> dict:
+        stats = {
+            "engine": self.engine,
+            "phases": dict(self.phases, total=sum(self.phases.values())),
+            "tokens": self.tokens,
+            "nodes": {"total": sum(self.nodes.values()), "by_type": dict(self.nodes)},
+        }
+        if self.engine == "tree":
+            lookups = {str(depth): n for depth, n in sorted(
+                item for item in self.lookups.items() if item[0] is not None)}
+            if None in self.lookups:
+                lookups["global"] = self.lookups[None]
+            stats.update({
+                "visits": dict(self.visits.most_common()),
+                # The script's Frame, and one per call run
+                "frames": self.frames,
+                "lookups": {"total": sum(self.lookups.values()), "by_depth": lookups},
+            })
+        if self.memo is not None:
+            stats["memo"] = self.memo.as_dict()
+        stats["peak_memory"] = self.peak_memory
+        return stats
+
+    def write(self, out: TextIO):
+        json.dump(self.as_dict(), out, indent=2)
+        out.write("\n")
+
+
+class CountingInterpreter(Interpreter):
+    """The tree walker, counting visits, frames and variable lookups into stats."""
+
+    def __init__(self, stats: RunStats, memo: Optional[Memo] = None):
+        super().__init__(memo)
+        self.stats = stats
+        stats.frames += 1
+
+    def invoke(self, function, frame: Frame) -> object:
+        self.stats.frames += 1
+        return super().invoke(function, frame)
+
+    def visit_variable(self, variable: Variable):
+        # Resolver depth: 0 is the current frame, None a global
+        self.stats.lookups[variable.depth] += 1
+        return super().visit_variable(variable)
+
+    def visit_assignment(self, assignment: Assignment):
+        if isinstance(assignment.target, Token):
+            self.stats.lookups[assignment.depth] += 1
+        return super().visit_assignment(assignment)
+
+
+def counted(name: str):
+    method = getattr(CountingInterpreter, name)
+
+    def visit(self, node, *args):
+        self.stats.visits[name] += 1
+        return method(self, node, *args)
+    return visit
+
+
+for name in dir(Interpreter):
+    if name.startswith("visit_"):
+        setattr(CountingInterpreter, name, counted(name))
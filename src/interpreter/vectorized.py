@@ -0,0 +1,156 @@
+import operator
+from itertools import accumulate
+from parser.grammar.functions import Callable
+
+from interpreter.arrays import READABLE, TypedArray, typed_array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Whole-array natives. Every loop below runs in C: through NumPy for float
+# typed arrays when it is installed, otherwise through builtins such as
+# sum, map and accumulate. Int arrays never go through NumPy, whose int64
+# arithmetic would silently wrap where py0 integers don't.
+
+
+def check_array(name: str, value: object):
+    if not isinstance(value, READABLE):
+        raise RuntimeError(f"{name} expects an array")
+
+
+def check_lengths(name: str, left, right):
+    check_array(name, left)
+    check_array(name, right)
+    if len(left) != len(right):
+        raise RuntimeError(f"{name} expects arrays of the same length")
+
+
+def is_float_array(value: object) -> bool:
+    return type(value) is TypedArray and value.typecode == "d"
+
+
+def vectorizable(*values: object) -> bool:
+    return numpy is not None and all(is_float_array(value) for value in values)
+
+
+def to_numpy(value: TypedArray):
+    # Shares the array's buffer instead of copying it
+    return numpy.frombuffer(value, dtype=numpy.float64)
+
+
+def from_numpy(value) -> TypedArray:
+    result = TypedArray("d")
+    result.frombytes(value.astype(numpy.float64).tobytes())
+    return result
+
+
+def like(values, *sources: object):
+    """Wraps results the way the inputs were stored: typed arrays stay typed."""
+    if not all(type(source) is TypedArray for source in sources):
+        return list(values)
+    if any(source.typecode == "d" for source in sources):
+        return typed_array(float, values)
+    return typed_array(int, values)
+
+
+class NativeSum(Callable):
+    def call(self, interpreter, args):
+        check_array("sum", args[0])
+        if vectorizable(args[0]):
+            return float(to_numpy(args[0]).sum())
+        return sum(args[0])
+
+    def arity(self):
+        return 1
+
+
+class NativeMin(Callable):
+    def call(self, interpreter, args):
+        check_array("min", args[0])
+        if len(args[0]) == 0:
+            raise RuntimeError("min of an empty array")
+        if vectorizable(args[0]):
+            return float(to_numpy(args[0]).min())
+        return min(args[0])
+
+    def arity(self):
+        return 1
+
+
+class NativeMax(Callable):
+    def call(self, interpreter, args):
+        check_array("max", args[0])
+        if len(args[0]) == 0:
+            raise RuntimeError("max of an empty array")
+        if vectorizable(args[0]):
+            return float(to_numpy(args[0]).max())
+        return max(args[0])
+
+    def arity(self):
+        return 1
+
+
+class NativeDot(Callable):
+    def call(self, interpreter, args):
+        left, right = args
+        check_lengths("dot", left, right)
+        if vectorizable(left, right):
+            return float(numpy.dot(to_numpy(left), to_numpy(right)))
+        return sum(map(operator.mul, left, right))
+
+    def arity(self):
+        return 2
+
+
+class NativeAdd(Callable):
+    def call(self, interpreter, args):
+        left, right = args
+        check_lengths("add", left, right)
+        if vectorizable(left, right):
+            return from_numpy(to_numpy(left) + to_numpy(right))
+        return like(map(operator.add, left, right), left, right)
+
+    def arity(self):
+        return 2
+
+
+class NativeMul(Callable):
+    def call(self, interpreter, args):
+        left, right = args
+        check_lengths("mul", left, right)
+        if vectorizable(left, right):
+            return from_numpy(to_numpy(left) * to_numpy(right))
+        return like(map(operator.mul, left, right), left, right)
+
+    def arity(self):
+        return 2
+
+
+class NativePrefixSum(Callable):
+    def call(self, interpreter, args):
+        check_array("prefix_sum", args[0])
+        if vectorizable(args[0]):
+            return from_numpy(numpy.cumsum(to_numpy(args[0])))
+        return like(accumulate(args[0]), args[0])
+
+    def arity(self):
+        return 1
+
+
+class NativeMapScale(Callable):
+    def call(self, interpreter, args):
+        values, factor = args
+        check_array("map_scale", values)
+        if type(factor) not in (int, float):
+            raise RuntimeError("map_scale factor must be an int or float")
+        if vectorizable(values):
+            return from_numpy(to_numpy(values) * factor)
+        scaled = [value * factor for value in values]
+        if type(values) is TypedArray and type(factor) is float:
+            return typed_array(float, scaled)
+        return like(scaled, values)
+
+    def arity(self):
+        return 2
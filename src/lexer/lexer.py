@@ -1,131 +1,129 @@
-from typing import List
+import re
+from typing import Iterable, Iterator, List, Union
 
 from lexer.tokens import RESERVED, SYNTAX, Token, TokenType
 from util.errors import error
 
+# One alternative per lexeme class. The character classes only cover ASCII;
+# anything else falls through to the slower checks in Lexer.scan_other, so
+# non-ASCII letters and digits lex exactly as str.isalpha/isdigit say.
+TOKEN = re.compile(r"""
+    (?P<blank>[ \t\n]+)
+  | (?P<identifier>[A-Za-z_]+)
+  | (?P<syntax>[=+\-><!]=|[(){}\[\].,:+\-*/%=><!&|^;]|\\res\b)
+  | (?P<number>[0-9]+(?:\.[0-9]+)?)
+  | (?P<string>"[^"\n]*"|'[^'\n]*')
+  | (?P<comment>\#[^\n]*\n?)
+""", re.VERBOSE)
+
+KEYWORDS = {word: TokenType(word) for word in RESERVED}
+OPERATORS = {lexeme: TokenType(lexeme) for lexeme in SYNTAX}
+OPERATORS.update({lexeme + "=": TokenType(lexeme + "=") for lexeme in "=+-><!"})
+# The value an ensures clause checks
+OPERATORS["\\res"] = TokenType.RESULT
+
+# An ASCII identifier or number may continue into non-ASCII letters/digits
+NONASCII_SENSITIVE = ("identifier", "number")
+IDENTIFIER, NUMBER, STRING = TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING
+
 
 def is_alpha(c: str):
     return c.isalpha() or c == '_'
 
 
 class Lexer:
-    def __init__(self, source: str):
-        self.source = source
+    """
+    source is either the whole program or an iterable of chunks that each
+    end on a line boundary (such as the lines of a file). No lexeme spans a
+    newline, so chunks are scanned one at a time without changing the
+    token stream, and tokens() can feed the parser before the rest of the
+    file has been read.
+    """
+
+    def __init__(self, source: Union[str, Iterable[str]]):
+        self.chunks = [source] if isinstance(source, str) else source
+        self.source = ""
         self.pos = 0
         self.line = 1
         self.col = 1
 
-    def lex_syntax(self):
-        cur = self.peek()
-        next = self.peek(1)
-        if cur == '=' and next == '=':
-            self.advance()
-            return Token(TokenType.EQUAL_EQUAL, "==", None, self.line)
-        if cur == '+' and next == '=':
-            self.advance()
-            return Token(TokenType.PLUS_EQUAL, "+=", None, self.line)
-        if cur == '-' and next == '=':
-            self.advance()
-            return Token(TokenType.MINUS_EQUAL, "-=", None, self.line)
-        if cur == '>' and next == '=':
-            self.advance()
-            return Token(TokenType.GREATER_EQUAL, ">=", None, self.line)
-        if cur == '<' and next == '=':
-            self.advance()
-            return Token(TokenType.LESS_EQUAL, "<=", None, self.line)
-        if cur == '!' and next == '=':
-            self.advance()
-            return Token(TokenType.BANG_EQUAL, "!=", None, self.line)
-        return Token(TokenType(cur), cur, None, self.line)
-
-    def lex_string(self) -> Token:
-        delimeter = self.peek()
-        self.advance()
-        res = ""
-        while self.peek() != delimeter:
-            if self.peek() == '\n' or self.end_of_source(1):
-                error(self.line, "Unclosed string")
-            res += self.peek()
-            self.advance()
-        return Token(TokenType.STRING, f"{delimeter}{res}{delimeter}", res, self.line)
-
-    def lex_number(self) -> Token:
-        res = ""
-        while self.peek().isdigit():
-            res += self.peek()
-            self.advance()
-        if self.peek() == '.' and self.peek(1).isdigit():
-            res += self.peek()
-            self.advance()
-            while self.peek().isdigit():
-                res += self.peek()
-                self.advance()
-        self.advance(-1)
-        return Token(TokenType.NUMBER, res, int(res), self.line)
-
-    def lex_identifier(self) -> Token:
-        res = ""
-        while is_alpha(self.peek()):
-            res += self.peek()
-            self.advance()
-        self.advance(-1)
-        if res in RESERVED:
-            return Token(TokenType(res), res, None, self.line)
-        else:
-            return Token(TokenType.IDENTIFIER, res, None, self.line)
-
     def scan(self) -> List[Token]:
-        tokens = []
-        while not self.end_of_source():
-            cur = self.peek()
-
-            # Skip the entire line after comments
-            if cur == '#':
-                while not self.end_of_source() and self.peek() != '\n':
-                    self.advance()
-                self.line += 1
-
-            # Skip newlines, but increase line count
-            elif cur == '\n':
-                self.line += 1
-
-            # Check for syntactical lexemes
-            elif cur in SYNTAX:
-                tokens.append(self.lex_syntax())
-
-            # Check for string literal lexemes
-            elif cur == '"' or cur == '\'':
-                tokens.append(self.lex_string())
-
-            # Check for numerical literal lexemes
-            elif cur.isdigit():
-                tokens.append(self.lex_number())
-
-            # Check for identifiers
-            elif is_alpha(cur):
-                tokens.append(self.lex_identifier())
-
-            # Check blank characters
-            elif cur == ' ' or cur == '\t':
-                pass
-
-            # Error on illegal characters
-            else:
-                error(self.line, f"Unidentified character: {cur}")
-
-            # Continue to next character
-            self.advance()
-
-        tokens.append(Token(TokenType.EOF, "", None, self.line))
-        return tokens
+        return list(self.tokens())
+
+    def tokens(self) -> Iterator[Token]:
+        match = TOKEN.match
+        line = self.line
+
+        for source in self.chunks:
+            self.source = source
+            end = len(source)
+            pos = 0
+
+            while pos < end:
+                m = match(source, pos)
+                kind = m and m.lastgroup
+                if kind is None or (kind in NONASCII_SENSITIVE
+                                    and not source[m.end():m.end() + 2].isascii()):
+                    self.pos, self.line = pos, line
+                    yield self.scan_other()
+                    pos = self.pos
+                    continue
+
+                text = m.group()
+                pos = m.end()
+
+                if kind == "blank":
+                    line += text.count("\n")
+                elif kind == "identifier":
+                    yield Token(KEYWORDS.get(text, IDENTIFIER), text, None, line)
+                elif kind == "syntax":
+                    yield Token(OPERATORS[text], text, None, line)
+                elif kind == "number":
+                    yield Token(NUMBER, text, int(text), line)
+                elif kind == "string":
+                    yield Token(STRING, text, text[1:-1], line)
+                # A comment also swallows its newline, so it always ends a line
+                else:
+                    line += 1
+
+            self.pos, self.line = pos, line
+
+        yield Token(TokenType.EOF, "", None, line)
+
+    def scan_other(self) -> Token:
+        """Lexes a token the master pattern can't, or raises its error."""
+        source = self.source
+        start = self.pos
+        cur = source[start]
+
+        if cur == '"' or cur == '\'':
+            error(self.line, "Unclosed string")
+
+        if cur.isdigit():
+            self.skip(str.isdigit)
+            if self.peek() == '.' and self.peek(1).isdigit():
+                self.pos += 1
+                self.skip(str.isdigit)
+            res = source[start:self.pos]
+            return Token(TokenType.NUMBER, res, int(res), self.line)
+
+        if is_alpha(cur):
+            self.skip(is_alpha)
+            res = source[start:self.pos]
+            return Token(KEYWORDS.get(res, TokenType.IDENTIFIER), res, None, self.line)
+
+        error(self.line, f"Unidentified character: {cur}")
+
+    def skip(self, predicate):
+        source = self.source
+        end = len(source)
+        while self.pos < end and predicate(source[self.pos]):
+            self.pos += 1
 
     def peek(self, offset=0) -> str:
         if self.end_of_source(offset):
             return '\0'
         return self.source[self.pos + offset]
 
-    def advance(self, offset=1):
-        self.pos += offset
-
     def end_of_source(self, offset=0) -> bool:
         return self.pos + offset >= 0 and self.pos + offset >= len(self.source)
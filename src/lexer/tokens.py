@@ -54,6 +54,10 @@ class TokenType(Enum):
     RETURN = "return"
     TRUE = "True"
     FALSE = "False"
+    REQUIRES = "requires"
+    ENSURES = "ensures"
+    LOOP_INVARIANT = "loop_invariant"
+    RESULT = "\\res"
 
     STR = "str"
     BOOL = "bool"
@@ -66,6 +70,8 @@ class TokenType(Enum):
 
 
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(self, type: TokenType, lexeme: str, literal: object, line: int):
         self.type = type
         self.lexeme = lexeme
@@ -83,7 +89,9 @@ SYNTAX = ['(', ')', '{', '}', '[', ']', '.', ',', ':',
 TYPES = ["str", "int", "float", "bool", "List", "None"]
 
 RESERVED = ["and", "or", "class", "if", "elif",
-            "else", "self", "def", "while", "for", "in", "return", "True", "False"]
+            "else", "self", "def", "while", "for", "in", "return", "True", "False",
+            "requires", "ensures", "loop_invariant"]
 
 SYNCHRONIZATION = [TokenType.CLASS, TokenType.DEF,
-                   TokenType.FOR, TokenType.IF, TokenType.WHILE, TokenType.RETURN]
+                   TokenType.FOR, TokenType.IF, TokenType.WHILE, TokenType.RETURN,
+                   TokenType.REQUIRES, TokenType.ENSURES, TokenType.LOOP_INVARIANT]
@@ -1,19 +1,34 @@
-from typing import Optional
+from itertools import count
+from typing import Optional, Set
 
 from lexer.tokens import Token
 
+# Shared by every Environment, so a version stamp also identifies the table
+_versions = count()
+
 
 class Environment:
     def __init__(self, enclosing: Optional['Environment'] = None):
         self.enclosing = enclosing
         self.values = {}
+        # Bumped whenever a watched name is rebound; inline caches compare
+        # against it to tell whether what they remember is still current
+        self.version = next(_versions)
+        self.watched: Set[str] = set()
+
+    def watch(self, name: str):
+        self.watched.add(name)
 
     def define(self, name: str, value: object):
+        if name in self.watched:
+            self.version = next(_versions)
         self.values[name] = value
 
     def assign(self, name: str, value: object):
         # Fix the assignment logic to properly update variables in the current scope
         if name in self.values:
+            if name in self.watched:
+                self.version = next(_versions)
             self.values[name] = value
             return value  # Return the value to indicate success
         elif self.enclosing is not None:
@@ -31,3 +46,19 @@ class Environment:
     def delete(self, name: Token):
         if name.lexeme in self.values:
             self.values.pop(name.lexeme)
+
+
+class Frame:
+    """Slot-indexed locals of one function call, laid out by the Resolver."""
+
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, values: list, enclosing: Optional['Frame'] = None):
+        self.values = values
+        self.enclosing = enclosing
+
+    def ancestor(self, depth: int) -> 'Frame':
+        frame = self
+        for _ in range(depth):
+            frame = frame.enclosing
+        return frame
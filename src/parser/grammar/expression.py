@@ -15,6 +15,8 @@ class Binary(Expression):
         self.left = left
         self.op = op
         self.right = right
+        # Set by TypeInference when the operand types can't fail typecheck
+        self.safe = False
 
     def accept(self, visitor):
         return visitor.visit_binary(self)
@@ -63,11 +65,33 @@ class Array(Expression):
         return visitor.visit_array(self)
 
 
+class ConstantArray(Expression):
+    def __init__(self, values: list):
+        # values is a template; nested constant arrays are nested lists
+        self.values = values
+        self.flat = not any(isinstance(value, list) for value in values)
+
+    def build(self) -> list:
+        if self.flat:
+            return list(self.values)
+        return _copy_template(self.values)
+
+    def accept(self, visitor):
+        return visitor.visit_constant_array(self)
+
+
+def _copy_template(values: list) -> list:
+    return [_copy_template(value) if isinstance(value, list) else value
+            for value in values]
+
+
 class ArrayAccess(Expression):
     def __init__(self, array: Expression, bracket: Token, index: Expression):
         self.array = array
         self.bracket = bracket
         self.index = index
+        # Set by TypeInference when array is known indexable and index an int
+        self.safe = False
 
     def accept(self, visitor):
         return visitor.visit_array_access(self)
@@ -78,6 +102,14 @@ class Call(Expression):
         self.callee = callee
         self.paren = paren
         self.args = args
+        # The callee (or, for py0 functions, its declaration) whose arity
+        # this call site has already validated
+        self.target = None
+        # Inline cache for a global callee: the globals' version it was
+        # read at and the value, set together so that runtimes sharing
+        # this tree from different threads never pair one's version with
+        # another's value
+        self.cached = (None, None)
 
     def accept(self, visitor):
         return visitor.visit_call(self)
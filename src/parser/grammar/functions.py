@@ -1,19 +1,17 @@
 from abc import ABC, abstractmethod
-from parser.environment import Environment
+from parser.environment import Frame
 from parser.grammar.statements import Function
-from typing import List
+from typing import List, Optional
 
 # from interpreter.interpreter import Interpreter
 
 # from interpreter.interpreter import Interpreter
 
 
-class ReturnException (Exception):
-    def __init__(self, value):
-        self.value = value
-
-
 class Callable(ABC):
+    # Set by natives that read input or write output, which pmap workers can't
+    io = False
+
     @abstractmethod
     def call(self, interpreter, args: List[object]) -> object:
         pass
@@ -23,17 +21,14 @@ class Callable(ABC):
 
 
 class FunctionCallable(Callable):
-    def __init__(self, function: Function):
+    def __init__(self, function: Function, closure: Optional[Frame] = None):
         self.function = function
+        self.closure = closure
+        # Slots for the body's locals, appended to the arguments on each call
+        self.padding = [None] * (function.slots - len(function.parameters))
 
     def call(self, interpreter, args):
-        environment = Environment(interpreter.env)
-        for parameter, arg in zip(self.function.parameters, args):
-            environment.define(parameter.lexeme, arg)
-        try:
-            interpreter.visit_block(self.function.body, environment)
-        except ReturnException as e:
-            return e.value
+        return interpreter.invoke(self.function, Frame(list(args) + self.padding, self.closure))
 
     def arity(self):
         return len(self.function.parameters)
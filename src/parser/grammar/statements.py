@@ -36,11 +36,24 @@ class Block(Statement):
         return visitor.visit_block(self, None)
 
 
+class Contract:
+    """A requires, ensures or loop_invariant clause, lowered away before execution."""
+
+    def __init__(self, keyword: Token, condition: Expression,
+                 message: Optional[Expression] = None):
+        self.keyword = keyword
+        self.condition = condition
+        # Only the old requires(condition, message) call form has one
+        self.message = message
+
+
 class Function(Statement):
     def __init__(self, name: Token, parameters: List[Token], body: Block):
         self.name = name
         self.parameters = parameters
         self.body = body
+        self.requires: List[Contract] = []
+        self.ensures: List[Contract] = []
 
     def accept(self, visitor):
         return visitor.visit_function(self)
@@ -69,6 +82,7 @@ class WhileStatement(Statement):
     def __init__(self, condition: Expression, body: Statement):
         self.condition = condition
         self.body = body
+        self.invariants: List[Contract] = []
 
     def accept(self, visitor):
         return visitor.visit_while_statement(self)
@@ -79,6 +93,7 @@ class ForStatement(Statement):
         self.name = name
         self.iterator = iterator
         self.body = body
+        self.invariants: List[Contract] = []
 
     def accept(self, visitor):
         return visitor.visit_for_statement(self)
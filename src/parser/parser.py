@@ -13,6 +13,7 @@ from parser.grammar.expression import (
 )
 from parser.grammar.statements import (
     Block,
+    Contract,
     ExpressionStatement,
     ForStatement,
     Function,
@@ -22,36 +23,55 @@ from parser.grammar.statements import (
     Var,
     WhileStatement,
 )
-from typing import List
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional
 
 from lexer.tokens import SYNCHRONIZATION, Token, TokenType
 
 
+class ScanError(RuntimeError):
+    """A lexer error met while pulling tokens; never recovered from."""
+
+
 class Parser():
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.index = 0
+    def __init__(self, tokens: Iterable[Token]):
+        # Tokens are pulled on demand, and the grammar looks one token ahead
+        # (past a parenthesis only for the old requires(condition, message)
+        # call), so a token stream is never held in full
+        self.tokens = iter(tokens)
+        self.buffer: Deque[Token] = deque()
+        self.last: Optional[Token] = None
+        self.had_error = False
+        # \res may only appear in an ensures clause
+        self.in_ensures = False
 
     def parse(self) -> List[Statement]:
-        statements = []
-        while not self.end_of_tokens():
-            if not self.end_of_tokens():
-                stmt = self.decleration()
-                if stmt is not None:
-                    statements.append(stmt)
+        return list(self.declarations())
 
-        return statements
+    def declarations(self) -> Iterator[Statement]:
+        """Yields each top-level statement as soon as it has been parsed."""
+        while not self.end_of_tokens():
+            stmt = self.decleration()
+            if stmt is not None:
+                yield stmt
 
     def peek(self, offset=0):
-        # Simple peek with bounds checking
-        idx = self.index + offset
-        if idx >= len(self.tokens):
-            idx = len(self.tokens) - 1
-        return self.tokens[idx]
+        # Past the end, keep returning the final (EOF) token
+        buffer = self.buffer
+        while len(buffer) <= offset:
+            try:
+                token = next(self.tokens, None)
+            except RuntimeError as e:
+                raise ScanError(str(e)) from e
+            if token is None:
+                return buffer[-1] if buffer else self.last
+            buffer.append(token)
+        return buffer[offset]
 
     def consume(self) -> Token:
         token = self.peek()
-        self.index += 1
+        if self.buffer:
+            self.last = self.buffer.popleft()
         return token
 
     def match(self, *args: TokenType) -> bool:
@@ -74,6 +94,9 @@ class Parser():
             if self.match(TokenType.DEF):
                 return self.function_decleration()
 
+            if self.match(TokenType.REQUIRES, TokenType.ENSURES, TokenType.LOOP_INVARIANT):
+                return self.contracts()
+
             # Then check if it's a variable declaration
             if self.match(TokenType.IDENTIFIER):
                 # Only peek at the next token if we're not at the end
@@ -82,8 +105,11 @@ class Parser():
 
             # Otherwise, it's a regular statement
             return self.statement()
+        except ScanError:
+            raise
         except RuntimeError as e:
             print(e)
+            self.had_error = True
             # print("SYNCHRONIZING")
             self.synchronize()
             return None  # Return None on error
@@ -104,6 +130,72 @@ class Parser():
         body = self.block()
         return Function(name, args, body)
 
+    def contracts(self) -> Statement:
+        """Contract clauses, then the def or loop they are attached to."""
+        if self.call_form():
+            return self.contract_call()
+        clauses = []
+        while self.match(TokenType.REQUIRES, TokenType.ENSURES, TokenType.LOOP_INVARIANT):
+            keyword = self.consume()
+            self.in_ensures = keyword.type == TokenType.ENSURES
+            try:
+                condition = self.expression()
+            finally:
+                self.in_ensures = False
+            self.expect(TokenType.SEMICOLON, "Expected semicolon after contract.")
+            clauses.append(Contract(keyword, condition))
+
+        invariants = [c for c in clauses if c.keyword.type == TokenType.LOOP_INVARIANT]
+        if self.match(TokenType.DEF):
+            if invariants:
+                raise RuntimeError("loop_invariant must come before a while or for loop.")
+            function = self.function_decleration()
+            function.requires = [c for c in clauses if c.keyword.type == TokenType.REQUIRES]
+            function.ensures = [c for c in clauses if c.keyword.type == TokenType.ENSURES]
+            return function
+        if self.match(TokenType.WHILE, TokenType.FOR):
+            if len(invariants) != len(clauses):
+                raise RuntimeError("requires and ensures must come before a def.")
+            loop = self.while_statement() if self.match(TokenType.WHILE) else self.for_statement()
+            loop.invariants = invariants
+            return loop
+        raise RuntimeError(f"Expected def or loop after contract. Got '{self.peek().lexeme}'.")
+
+    def call_form(self) -> bool:
+        """
+        Whether the clause ahead is requires(condition, message); or the
+        same with ensures: the calls the requires and ensures natives took
+        before they became keywords, told apart by their comma.
+        """
+        if not self.match(TokenType.REQUIRES, TokenType.ENSURES):
+            return False
+        if self.peek(1).type != TokenType.LEFT_PAREN:
+            return False
+        depth, offset = 1, 2
+        while depth:
+            token_type = self.peek(offset).type
+            if token_type in (TokenType.LEFT_PAREN, TokenType.LEFT_SQUARE):
+                depth += 1
+            elif token_type in (TokenType.RIGHT_PAREN, TokenType.RIGHT_SQUARE):
+                depth -= 1
+            elif token_type == TokenType.COMMA and depth == 1:
+                return True
+            elif token_type in (TokenType.SEMICOLON, TokenType.EOF):
+                return False
+            offset += 1
+        return False
+
+    def contract_call(self) -> Statement:
+        """Deprecated: checked where it stands, like the natives were."""
+        keyword = self.consume()
+        self.consume()  # get rid of left parenthesis
+        condition = self.expression()
+        self.expect(TokenType.COMMA, "Expected comma.")
+        message = self.expression()
+        paren = self.expect(TokenType.RIGHT_PAREN, "Unclosed parenthesis.")
+        self.expect(TokenType.SEMICOLON, "Expected semicolon.")
+        return ExpressionStatement(Call(Variable(keyword), paren, [condition, message]))
+
     def var_decleration(self) -> Statement:
         name = self.consume()
         self.expect(TokenType.EQUAL, "Variable not declared.")
@@ -286,6 +378,11 @@ class Parser():
         if self.match(TokenType.IDENTIFIER):
             return Variable(self.consume())
 
+        if self.match(TokenType.RESULT):
+            if not self.in_ensures:
+                raise RuntimeError("\\res can only be used in an ensures clause.")
+            return Variable(self.consume())
+
         if self.match(TokenType.LEFT_PAREN):
             self.consume()  # get rid of left parenthesis
             expr = self.expression()
@@ -320,7 +417,7 @@ class Parser():
             self.consume()
 
     def end_of_tokens(self) -> bool:
-        return self.index >= len(self.tokens) or self.tokens[self.index].type == TokenType.EOF
+        return self.peek().type == TokenType.EOF
 
     def print_ast(self, statements: List[Statement], indent: int = 0) -> None:
         """Print the AST in a readable format with proper indentation."""
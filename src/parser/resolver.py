@@ -0,0 +1,213 @@
+from parser.grammar.expression import (
+    Array,
+    ArrayAccess,
+    Assignment,
+    Binary,
+    Call,
+    ConstantArray,
+    Expression,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+)
+from parser.grammar.statements import (
+    Block,
+    ExpressionStatement,
+    ForStatement,
+    Function,
+    IfStatement,
+    ReturnStatement,
+    Statement,
+    Var,
+    WhileStatement,
+)
+from typing import Dict, List, Optional, Set, Tuple
+
+from interpreter.natives import native_names
+from util.visitor import ExpressionVisitor, StatementVisitor
+
+
+class FunctionScope:
+    def __init__(self, enclosing: Optional['FunctionScope']):
+        self.enclosing = enclosing
+        self.scopes: List[Dict[str, int]] = []
+        self.slots = 0
+
+    def declare(self, name: str) -> int:
+        # Slots are never reused, so a function that outlives a block
+        # never sees another variable in its captured slot
+        slot = self.slots
+        self.slots += 1
+        self.scopes[-1][name] = slot
+        return slot
+
+    def lookup(self, name: str) -> Optional[int]:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+
+class Resolver(ExpressionVisitor, StatementVisitor):
+    """
+    Gives every variable access a static (depth, slot) coordinate.
+
+    Each function call gets one flat frame holding its parameters and every
+    local declared in its body, so blocks never allocate anything at run
+    time. depth counts how many declaring functions to walk out through;
+    a depth of None means the name is a global. Top-level declarations are
+    globals, as are assignments inside a function to names it cannot see
+    locally, and declarations anywhere of a global already declared.
+    Natives count as declared outside functions only: inside one, a
+    declaration of a native's name, like sum, declares a local.
+    """
+
+    def __init__(self):
+        self.function = FunctionScope(None)
+        self.natives: Set[str] = native_names()
+        # Globals the program itself declared
+        self.globals: Set[str] = set()
+
+    def resolve(self, statements: List[Statement]) -> int:
+        """Resolve top-level statements, returning the script frame size."""
+        for statement in statements:
+            self.exec(statement)
+        return self.function.slots
+
+    def state(self) -> str:
+        """What resolving further statements depends on, as text."""
+        return f"{self.function.slots}:{','.join(sorted(self.globals))}"
+
+    def lookup(self, name: str) -> Tuple[Optional[int], Optional[int]]:
+        function, depth = self.function, 0
+        while function is not None:
+            slot = function.lookup(name)
+            if slot is not None:
+                return depth, slot
+            function, depth = function.enclosing, depth + 1
+        return None, None
+
+    def at_top_level(self) -> bool:
+        return self.function.enclosing is None and not self.function.scopes
+
+    # Expressions
+
+    def visit_literal(self, literal: Literal):
+        pass
+
+    def visit_grouping(self, grouping: Grouping):
+        self.eval(grouping.expr)
+
+    def visit_unary(self, unary: Unary):
+        self.eval(unary.right)
+
+    def visit_array(self, array: Array):
+        for element in array.elements:
+            self.eval(element)
+
+    def visit_constant_array(self, constant_array: ConstantArray):
+        pass
+
+    def visit_array_access(self, array_access: ArrayAccess):
+        self.eval(array_access.array)
+        self.eval(array_access.index)
+
+    def visit_call(self, call: Call):
+        self.eval(call.callee)
+        for arg in call.args:
+            self.eval(arg)
+
+    def visit_binary(self, binary: Binary):
+        self.eval(binary.left)
+        self.eval(binary.right)
+
+    def visit_logical(self, logical: Logical):
+        self.eval(logical.left)
+        self.eval(logical.right)
+
+    def visit_assignment(self, assignment: Assignment):
+        self.eval(assignment.value)
+        if isinstance(assignment.target, ArrayAccess):
+            self.eval(assignment.target)
+        else:
+            assignment.depth, assignment.slot = self.lookup(
+                assignment.target.lexeme)
+
+    def visit_variable(self, variable: Variable):
+        variable.depth, variable.slot = self.lookup(variable.name.lexeme)
+
+    # Statements
+
+    def visit_expression_statement(self, expression_stmt: ExpressionStatement):
+        self.eval(expression_stmt.expr)
+
+    def visit_var(self, var: Var):
+        if var.initializer is not None:
+            self.eval(var.initializer)
+        name = var.name.lexeme
+        var.depth, var.slot = self.lookup(name)
+        if var.depth is not None:
+            return
+        # A global declared above is stored to wherever the statement is,
+        # and so is a native outside functions; anything else declares a
+        # new local
+        if (self.at_top_level() or name in self.globals
+                or (name in self.natives and self.function.enclosing is None)):
+            self.globals.add(name)
+        else:
+            var.depth, var.slot = 0, self.function.declare(name)
+
+    def visit_block(self, block: Block, new_env=None):
+        self.function.scopes.append({})
+        for statement in block.statements:
+            if statement is not None:
+                self.exec(statement)
+        self.function.scopes.pop()
+
+    def visit_function(self, function: Function):
+        # Bind the name before resolving the body so it can recurse
+        if self.at_top_level():
+            self.globals.add(function.name.lexeme)
+            function.depth, function.slot = None, None
+        else:
+            function.depth = 0
+            function.slot = self.function.declare(function.name.lexeme)
+
+        self.function = FunctionScope(self.function)
+        self.function.scopes.append({})
+        for parameter in function.parameters:
+            self.function.declare(parameter.lexeme)
+        for statement in function.body.statements:
+            if statement is not None:
+                self.exec(statement)
+        function.slots = self.function.slots
+        self.function = self.function.enclosing
+
+    def visit_if_statement(self, if_stmt: IfStatement):
+        self.eval(if_stmt.condition)
+        self.exec(if_stmt.then_stmt)
+        if if_stmt.else_stmt is not None:
+            self.exec(if_stmt.else_stmt)
+
+    def visit_while_statement(self, while_stmt: WhileStatement):
+        self.eval(while_stmt.condition)
+        self.exec(while_stmt.body)
+
+    def visit_for_statement(self, for_stmt: ForStatement):
+        self.eval(for_stmt.iterator)
+        self.function.scopes.append({})
+        for_stmt.slot = self.function.declare(for_stmt.name.lexeme)
+        self.exec(for_stmt.body)
+        self.function.scopes.pop()
+
+    def visit_return_statement(self, return_stmt: ReturnStatement):
+        if return_stmt.expr is not None:
+            self.eval(return_stmt.expr)
+
+    def eval(self, expr: Expression):
+        expr.accept(self)
+
+    def exec(self, statement: Statement):
+        statement.accept(self)
@@ -1,29 +1,269 @@
 #!/usr/bin/env python3
 
 import argparse
+import io
+import mmap
 import os
 import sys
+import tracemalloc
+from contextlib import nullcontext
 from parser.parser import Parser
+from parser.resolver import Resolver
 
+from compiler.cache import VERSION, ProgramCache
+from compiler.closures import ClosureCompiler
+from compiler.compiler import Compiler
+from compiler.contracts import ContractLowering, parse_mode
+from compiler.inference import TypeInference
+from compiler.optimizer import Optimizer
+from compiler.purity import PurityAnalyzer
+from compiler.transpiler import PythonRuntime
+from compiler.vm import MAX_DEPTH, VM
+from interpreter.console import Console
 from interpreter.interpreter import Interpreter
+from interpreter.memo import MEMO_SIZE, Memo
+from interpreter.parallel import WORKERS, set_workers
+from interpreter.profiler import Profiler, ProfilingInterpreter
+from interpreter.stats import CountingInterpreter, RunStats, count_nodes
 from lexer.lexer import Lexer
 
+ENGINES = ["tree", "vm", "closure", "python"]
 
-def run(source):
-    lexer = Lexer(source)
-    tokens = lexer.scan()
+# The python engine transpiles whole programs, so it can't take one
+# top-level statement at a time
+STREAM_ENGINES = ["tree", "vm", "closure"]
 
-    parser = Parser(tokens)
-    statements = parser.parse()
 
-    interpreter = Interpreter()
-    interpreter.interpret(statements)
+def frontend(source, optimize=0, stats=None, contracts="full", resolver=None):
+    """
+    Lexes, parses, optimizes, resolves and type-infers a program. A
+    resolver given here has resolved earlier statements, like a prelude's;
+    the program is resolved as their continuation, and inferred the way
+    streamed statements are, since the earlier ones may call its defs or
+    have rebound natives.
+    """
+    phase = nullcontext if stats is None else stats.phase
+    with phase("lex"):
+        lexer = Lexer(source)
+        tokens = lexer.scan()
+
+    with phase("parse"):
+        parser = Parser(tokens)
+        statements = parser.parse()
+        statements = ContractLowering(*parse_mode(contracts)).lower(statements)
+    if optimize >= 1:
+        with phase("optimize"):
+            statements = Optimizer().optimize(statements)
+    with phase("resolve"):
+        slots = (resolver or Resolver()).resolve(statements)
+    with phase("infer"):
+        TypeInference(whole_program=resolver is None).infer(statements)
+
+    if stats is not None:
+        stats.tokens = len(tokens)
+        stats.nodes = count_nodes(statements)
+    return statements, slots, parser.had_error
+
+
+def load_program(source, optimize=0, path=None, stats=None, contracts="full", resolver=None):
+    """The front end's output for source, through the cache next to path if given."""
+    if path is None:
+        statements, slots, _ = frontend(source, optimize, stats, contracts, resolver)
+        return statements, slots
+
+    context = resolver.state() if resolver is not None else ""
+    cache = ProgramCache(path, optimize, contracts, context)
+    cached = cache.load(source)
+    if cached is not None:
+        return cached
+    statements, slots, had_error = frontend(source, optimize, contracts=contracts,
+                                            resolver=resolver)
+    # Syntax errors are reported while parsing, so a program that
+    # had any must keep going through the parser
+    if not had_error:
+        cache.store(source, statements, slots)
+    return statements, slots
+
+
+def run(source, engine="tree", optimize=0, path=None, max_depth=MAX_DEPTH, profiler=None,
+        stats=None, memo=None, contracts="full"):
+    statements, slots = load_program(source, optimize, path, stats, contracts)
+    if memo is not None:
+        PurityAnalyzer().analyze(statements)
+    execute = executor(engine, max_depth, profiler, stats, memo)
+    with nullcontext() if stats is None else stats.phase("execute"):
+        execute(statements, slots)
+
+
+def run_stream(lines, engine="tree", optimize=0, max_depth=MAX_DEPTH, profiler=None,
+               contracts="full"):
+    """Runs each top-level statement as soon as it has been parsed."""
+    parser = Parser(Lexer(lines).tokens())
+    lowering = ContractLowering(*parse_mode(contracts))
+    optimizer = Optimizer()
+    resolver = Resolver()
+    execute = executor(engine, max_depth, profiler)
+    for statement in parser.declarations():
+        statements = lowering.lower([statement])
+        if optimize >= 1:
+            statements = optimizer.optimize(statements)
+        slots = resolver.resolve(statements)
+        TypeInference(whole_program=False).infer(statements)
+        execute(statements, slots)
+
+
+class Run:
+    """What one run of a Program left behind."""
+
+    def __init__(self, output, values):
+        # Everything printed, or None if it went to a stdout of the caller's
+        self.output = output
+        # The globals the program defined, natives it rebound included
+        self.values = values
+
+
+class Program:
+    """
+    A program taken through the front end once, and compiled once for the
+    vm and python engines, to be run any number of times. Every run gets a
+    fresh runtime, so it starts from the natives alone and has its own
+    stdin and stdout; runs never change the Program, so threads can share
+    one.
+    """
+
+    def __init__(self, statements, slots, engine="tree", max_depth=MAX_DEPTH):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine '{engine}'")
+        self.statements = statements
+        self.slots = slots
+        self.engine = engine
+        self.max_depth = max_depth
+        self.code = None
+        if engine == "vm":
+            self.code = Compiler().compile(statements, slots)
+        elif engine == "python":
+            self.code = PythonRuntime().translate(statements)
+
+    def run(self, inputs=None, stdout=None) -> Run:
+        """
+        Runs the program once. inputs is its stdin: a string, a list of
+        lines or a file; there is none by default. What it prints goes to
+        stdout if given, and is returned as Run.output otherwise.
+        """
+        if inputs is None or isinstance(inputs, str):
+            inputs = io.StringIO(inputs or "")
+        elif not hasattr(inputs, "readline"):
+            inputs = io.StringIO("".join(f"{line}\n" for line in inputs))
+        out = io.StringIO() if stdout is None else stdout
+
+        runtime = self.runtime()
+        runtime.console = Console(inputs, out)
+        natives = dict(runtime.env.values)
+        if self.engine == "vm":
+            runtime.run(self.code)
+        elif self.engine == "python":
+            runtime.start(runtime.load(*self.code))
+        elif self.engine == "closure":
+            runtime.run(self.statements, self.slots)
+        else:
+            runtime.interpret(self.statements, self.slots)
+
+        if self.engine == "python":
+            table = {name[2:]: value for name, value in runtime.module.items()
+                     if name.startswith("v_")}
+        else:
+            table = runtime.env.values
+        values = {name: value for name, value in table.items()
+                  if name not in natives or natives[name] is not value}
+        return Run(out.getvalue() if stdout is None else None, values)
+
+    def runtime(self):
+        if self.engine == "vm":
+            return VM(self.max_depth)
+        elif self.engine == "closure":
+            return ClosureCompiler()
+        elif self.engine == "python":
+            return PythonRuntime()
+        return Interpreter()
+
+
+def compile(source, engine="tree", optimize=0, contracts="full", max_depth=MAX_DEPTH) -> Program:
+    """The Program for source, for embedding: py0.compile(source).run(inputs="3\n")."""
+    statements, slots, had_error = frontend(source, optimize, contracts=contracts)
+    if had_error:
+        raise RuntimeError("the program has syntax errors")
+    return Program(statements, slots, engine, max_depth)
+
+
+def executor(engine, max_depth=MAX_DEPTH, profiler=None, stats=None, memo=None):
+    """Returns a function running resolved statements on one engine instance."""
+    if engine == "vm":
+        vm = VM(max_depth)
+        return lambda statements, slots: vm.run(Compiler().compile(statements, slots))
+    elif engine == "closure":
+        compiler = ClosureCompiler()
+        return compiler.run
+    elif engine == "python":
+        return lambda statements, slots: PythonRuntime().run(statements)
+    else:
+        # Profiling and counting are subclasses, so plain runs pay nothing for them
+        if profiler is not None:
+            interpreter = ProfilingInterpreter(profiler, memo)
+        elif stats is not None:
+            interpreter = CountingInterpreter(stats, memo)
+        else:
+            interpreter = Interpreter(memo)
+        return interpreter.interpret
+
+
+def write_profile(profiler, args):
+    profiler.stop()
+    if args.profile:
+        profiler.report(sys.stderr)
+    if args.pstats:
+        profiler.dump_stats(args.pstats)
+    if args.collapsed:
+        profiler.write_collapsed(args.collapsed)
+
+
+def write_stats(stats, path):
+    stats.peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if path is None:
+        stats.write(sys.stderr)
+    else:
+        with open(path, "w") as file:
+            stats.write(file)
+
+
+def read_lines(path):
+    """Yields the lines of a file through a memory map, decoded one at a time."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            for line in iter(source.readline, b""):
+                # Universal newlines, as open() in text mode would give
+                yield line.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
 
 
 def main():
+    # Imported here, since these commands run their programs through this module
+    if sys.argv[1:2] == ["batch"]:
+        from batch import main as batch
+        sys.exit(batch(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        from server import main as serve
+        sys.exit(serve(sys.argv[2:]))
+    if sys.argv[1:2] == ["client"]:
+        from client import main as client
+        sys.exit(client(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(
         description="Py0 - A simplified Python-like language interpreter",
-        epilog="For more information, visit https://github.com/vincent-qc/py0"
+        epilog="Run 'py0.py batch -h' for running many programs at once, and "
+               "'py0.py serve -h' for keeping a warm interpreter resident. "
+               "For more information, visit https://github.com/vincent-qc/py0"
     )
 
     parser.add_argument(
@@ -38,10 +278,121 @@ def main():
         help="Enable verbose output during execution"
     )
 
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="tree",
+        help="Execution engine: the AST walker, the bytecode VM, compiled closures or "
+             "transpiled Python code (default: tree)"
+    )
+
+    parser.add_argument(
+        "--transpile",
+        dest="engine",
+        action="store_const",
+        const="python",
+        help="Transpile to Python code objects before running (same as --engine=python)"
+    )
+
+    parser.add_argument(
+        "-O",
+        dest="optimize",
+        type=int,
+        choices=[0, 1],
+        default=0,
+        help="Optimization level: -O1 folds constants and drops dead branches (default: -O0)"
+    )
+
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=MAX_DEPTH,
+        help=f"Maximum py0 call depth for the vm engine, which keeps its own call stack "
+             f"and runs tail calls in constant space (default: {MAX_DEPTH})"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Execute each top-level statement as soon as it is parsed, reading the file "
+             "through a memory map (not supported by the python engine)"
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile calls and lines on the tree engine and print a table to stderr"
+    )
+
+    parser.add_argument(
+        "--pstats",
+        metavar="PATH",
+        help="Profile, and write the function profile to PATH in pstats format"
+    )
+
+    parser.add_argument(
+        "--collapsed",
+        metavar="PATH",
+        help="Profile, and write collapsed call stacks to PATH for flamegraph tools"
+    )
+
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-phase times, token and node counts, tree-walker visit counts and "
+             "peak memory as JSON to stderr. Skips the cache, and the instrumentation "
+             "slows execution, so only compare times between --stats runs"
+    )
+
+    parser.add_argument(
+        "--stats-file",
+        metavar="PATH",
+        help="Write the --stats JSON to PATH instead of stderr"
+    )
+
+    parser.add_argument(
+        "--contracts",
+        metavar="MODE",
+        default="full",
+        help="Which requires, ensures and loop_invariant clauses to check: off compiles "
+             "them all out, requires keeps only preconditions, full checks everything and "
+             "sample:N checks each clause every Nth time it is reached (default: full)"
+    )
+
+    parser.add_argument(
+        "--memoize",
+        action="store_true",
+        help="Cache the results of pure functions on the tree engine, keyed on their "
+             "arguments; -v prints hit and miss counts"
+    )
+
+    parser.add_argument(
+        "--memo-size",
+        type=int,
+        default=MEMO_SIZE,
+        help=f"Results kept per memoized function before the least recently used goes "
+             f"(default: {MEMO_SIZE})"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help=f"Processes pmap spreads its work over; 1 runs it in-process "
+             f"(default: one per CPU, {WORKERS} here)"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Don't read or write the __py0cache__ entry for the file"
+    )
+
     parser.add_argument(
         "--version",
         action="version",
-        version="Py0 v0.1.0",
+        version=f"Py0 v{VERSION}",
     )
 
     args = parser.parse_args()
@@ -52,6 +403,44 @@ def main():
         print("Error: No file provided. Use -h for help.")
         sys.exit(1)
 
+    if args.stream and args.engine not in STREAM_ENGINES:
+        parser.error(f"--stream is not supported by the {args.engine} engine")
+
+    try:
+        parse_mode(args.contracts)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = None
+    if args.profile or args.pstats or args.collapsed:
+        if args.engine != "tree":
+            parser.error("profiling is only supported by the tree engine")
+        profiler = Profiler(filename)
+
+    memo = None
+    if args.memoize:
+        if args.engine != "tree":
+            parser.error("--memoize is only supported by the tree engine")
+        if args.stream:
+            parser.error("--memoize needs the whole program and can't be combined with --stream")
+        if args.memo_size < 1:
+            parser.error("--memo-size must be at least 1")
+        memo = Memo(args.memo_size)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    set_workers(args.workers)
+
+    stats = None
+    if args.stats or args.stats_file:
+        if args.stream:
+            parser.error("--stats can't be combined with --stream")
+        if profiler is not None:
+            parser.error("--stats can't be combined with profiling")
+        stats = RunStats(args.engine)
+        stats.memo = memo
+        tracemalloc.start()
+
     try:
         if not os.path.isfile(filename):
             raise FileNotFoundError(f"The file '{filename}' does not exist.")
@@ -59,10 +448,17 @@ def main():
         if not filename.endswith(".py0"):
             print(f"Warning: '{filename}' doesn't have a .py0 extension.")
 
-        with open(filename, "r") as file:
-            source = file.read()
+        if args.stream:
+            run_stream(read_lines(filename), args.engine, args.optimize, args.max_depth,
+                       profiler, args.contracts)
+        else:
+            with open(filename, "r") as file:
+                source = file.read()
 
-        run(source)
+            # Stats time every phase, so they never take the program from the cache
+            path = filename if args.cache and stats is None else None
+            run(source, args.engine, args.optimize, path, args.max_depth, profiler, stats,
+                memo, args.contracts)
 
     except FileNotFoundError as e:
         print(f"Error: {e}")
@@ -70,6 +466,13 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            write_profile(profiler, args)
+        if stats is not None:
+            write_stats(stats, args.stats_file)
+        if memo is not None and args.verbose:
+            memo.report(sys.stderr)
 
 
 if __name__ == "__main__":
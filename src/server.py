@@ -0,0 +1,244 @@
+import argparse
+import gc
+import os
+import selectors
+import signal
+import socket
+import sys
+from parser.resolver import Resolver
+
+from client import receive_message, send_message
+from compiler.contracts import parse_mode
+from compiler.vm import MAX_DEPTH
+from py0 import STREAM_ENGINES, executor, load_program
+
+
+class ForkServer:
+    """
+    Keeps one engine resident, with its natives defined and a prelude
+    already run, and forks a child from that state for every request on
+    a Unix socket. The child takes over the client's stdin, stdout and
+    stderr, runs the script and exits; its exit status goes back to the
+    client. Children share the warm state copy-on-write, so nothing one
+    script does is seen by the next.
+    """
+
+    def __init__(self, path, engine="tree", max_depth=MAX_DEPTH):
+        self.path = path
+        self.execute = executor(engine, max_depth)
+        self.listener = None
+        self.selector = selectors.DefaultSelector()
+        # pid -> connection of the client waiting for that child
+        self.children = {}
+        self.wakeup = None
+        # Resolves the prelude, and then every script as its continuation
+        self.resolver = None
+
+    def prelude(self, filename, optimize=0, contracts="full"):
+        with open(filename, "r") as file:
+            source = file.read()
+        # Never from the cache: scripts are resolved where resolving the
+        # prelude leaves off
+        self.resolver = Resolver()
+        self.execute(*load_program(source, optimize, contracts=contracts,
+                                   resolver=self.resolver))
+
+    def listen(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                # Left behind by a server that is gone
+                os.unlink(self.path)
+            else:
+                raise RuntimeError(f"a py0 server is already listening on {self.path}")
+            finally:
+                probe.close()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+        # SIGCHLD wakes the selector through this pipe, so exits are
+        # reported as soon as they happen
+        self.wakeup, notify = os.pipe()
+        os.set_blocking(self.wakeup, False)
+        os.set_blocking(notify, False)
+        signal.set_wakeup_fd(notify)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        self.selector.register(self.wakeup, selectors.EVENT_READ)
+
+    def serve_forever(self):
+        # What the children inherit is never collected, so the collector
+        # doesn't copy its pages into every child by touching them
+        gc.freeze()
+        while True:
+            for key, _ in self.selector.select():
+                if key.fileobj is self.listener:
+                    self.accept()
+                else:
+                    try:
+                        while os.read(self.wakeup, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+            self.reap()
+
+    def accept(self):
+        conn, _ = self.listener.accept()
+        try:
+            request, fds = receive_message(conn, 3)
+        except (OSError, ValueError):
+            conn.close()
+            return
+        if request is None or len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+            return
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self.child(request, fds)
+        for fd in fds:
+            os.close(fd)
+        self.children[pid] = conn
+
+    def child(self, request, fds):
+        status = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.selector.close()
+            self.listener.close()
+            for conn in self.children.values():
+                conn.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            os.chdir(request["cwd"])
+            status = self.run(request)
+            sys.stdout.flush()
+        finally:
+            os._exit(status)
+
+    def run(self, request):
+        """Runs the requested script the way py0.py would; returns the exit status."""
+        filename = request["file"]
+        try:
+            if not os.path.isfile(filename):
+                raise FileNotFoundError(f"The file '{filename}' does not exist.")
+            if not filename.endswith(".py0"):
+                print(f"Warning: '{filename}' doesn't have a .py0 extension.")
+            contracts = request["contracts"]
+            parse_mode(contracts)
+            with open(filename, "r") as file:
+                source = file.read()
+            path = filename if request["cache"] else None
+            # Each child has its own copy of the resolver to continue from
+            self.execute(*load_program(source, request["optimize"], path,
+                                       contracts=contracts, resolver=self.resolver))
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+        return 0
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = self.children.pop(pid, None)
+            if conn is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            # Killed by a signal: report it the way a shell would
+            try:
+                send_message(conn, {"exit": code if code >= 0 else 128 - code})
+            except OSError:
+                pass
+            conn.close()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="py0 serve",
+        description="Keeps a warm py0 interpreter resident and runs every program sent by "
+                    "'py0 client' in a fork of it"
+    )
+
+    parser.add_argument(
+        "--socket",
+        required=True,
+        metavar="PATH",
+        help="Unix socket to listen on"
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=STREAM_ENGINES,
+        default="tree",
+        help="Execution engine; it must keep its globals between programs (default: tree)"
+    )
+
+    parser.add_argument(
+        "--prelude",
+        metavar="FILE",
+        help="A .py0 file to run once at startup; every program sees what it defines"
+    )
+
+    parser.add_argument(
+        "-O", "--optimize",
+        type=int,
+        choices=[0, 1],
+        default=0,
+        help="Optimization level for the prelude (default: 0)"
+    )
+
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=MAX_DEPTH,
+        help=f"Maximum call depth for the vm engine (default: {MAX_DEPTH})"
+    )
+
+    args = parser.parse_args(argv)
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        parser.error("serving needs fork() and Unix sockets")
+
+    server = ForkServer(args.socket, args.engine, args.max_depth)
+    # Stopping the server removes its socket too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.prelude:
+            server.prelude(args.prelude, args.optimize)
+        server.listen()
+        print(f"py0 serving on {args.socket}", file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
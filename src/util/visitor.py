@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from parser.environment import Environment
+from parser.environment import Frame
 from parser.grammar.expression import (
     Assignment,
     Binary,
     Call,
+    Expression,
     Grouping,
     Literal,
     Logical,
@@ -16,10 +17,11 @@ from parser.grammar.statements import (
     ForStatement,
     Function,
     IfStatement,
+    Statement,
     Var,
     WhileStatement,
 )
-from typing import Optional
+from typing import Iterator, Optional
 
 
 class ExpressionVisitor(ABC):
@@ -70,7 +72,7 @@ class StatementVisitor(ABC):
         pass
 
     @abstractmethod
-    def visit_block(self, block: Block, new_env: Optional[Environment]):
+    def visit_block(self, block: Block, new_env: Optional[Frame]):
         pass
 
     @abstractmethod
@@ -86,6 +88,18 @@ class StatementVisitor(ABC):
         pass
 
 
+def walk(node) -> Iterator[object]:
+    """Yields node and every Expression/Statement nested inside it."""
+    yield node
+    for value in vars(node).values():
+        if isinstance(value, (Expression, Statement)):
+            yield from walk(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, (Expression, Statement)):
+                    yield from walk(item)
+
+
 # class ExpressionPrinter(ExpressionVisitor):
 #     def visit_binary(self, binary: Binary):
 #         return f"({binary.left.accept(self)} {binary.op.lexeme} {binary.right.accept(self)})"
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import py0  # noqa: E402
+
+
+@pytest.fixture(params=py0.ENGINES)
+def engine(request):
+    return request.param
+
+
+@pytest.fixture
+def output(engine):
+    """Runs a program on each engine in turn, returning what it printed."""
+    def output(source, **options):
+        return py0.compile(source, engine=engine, **options).run().output
+    return output
@@ -0,0 +1,25 @@
+import py0
+
+
+def test_signed_zeros_keep_separate_constants(output):
+    source = "print(0 / -1);\nprint(0 / 1);"
+    for optimize in (0, 1):
+        assert output(source, optimize=optimize) == "-0.0\n0.0\n"
+
+
+def test_outer_variables_share_a_constant():
+    source = """
+def outer() {
+  n = 1;
+  def inner() {
+    return n + n + n;
+  }
+  return inner();
+}
+print(outer());
+"""
+    program = py0.compile(source, engine="vm")
+    outer = next(c for c in program.code.consts if hasattr(c, "consts"))
+    inner = next(c for c in outer.consts if hasattr(c, "consts"))
+    assert [c for c in inner.consts if isinstance(c, tuple)] == [(1, 0)]
+    assert program.run().output == "3\n"
@@ -0,0 +1,46 @@
+import pytest
+
+import py0
+
+
+def test_sampled_checks_restart_every_run(engine):
+    source = """
+requires x > 0;
+def f(x) {
+  return x;
+}
+print(f(1));
+print(f(0));
+print(f(1));
+"""
+    program = py0.compile(source, engine=engine, contracts="sample:2")
+    for _ in range(3):
+        assert program.run().output == "1\n0\n1\n"
+
+
+def test_deprecated_call_form_reports_its_message(output):
+    source = """
+def half(x) {
+  requires(x > 2, "x must be over 2");
+  y = x / 2;
+  ensures(y * 2 == x, "halving lost something");
+  return y;
+}
+print(half(4));
+print(half(2));
+"""
+    with pytest.raises(RuntimeError, match="requires clause failed: x must be over 2"):
+        output(source)
+
+
+def test_parenthesized_clause_is_not_the_call_form(output):
+    source = """
+requires (x > 0) and x < 5;
+def f(x) {
+  return x;
+}
+print(f(1));
+print(f(7));
+"""
+    with pytest.raises(RuntimeError, match="requires clause failed$"):
+        output(source)
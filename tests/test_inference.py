@@ -0,0 +1,29 @@
+import py0
+from parser.grammar.expression import Binary
+from util.visitor import walk
+
+
+def binaries(source):
+    statements, _, _ = py0.frontend(source)
+    return [node for statement in statements for node in walk(statement)
+            if isinstance(node, Binary)]
+
+
+def test_tags_reach_defs_declared_before_their_callees():
+    # Each def calls the next one down, so tags flow against source order
+    names = ["qa", "qb", "qc", "qd", "qe"]
+    source = "".join(f"def {caller}(x) {{\n  return {callee}(x) + 1;\n}}\n"
+                     for caller, callee in zip(names, names[1:]))
+    source += "def qe(x) {\n  return x * 2;\n}\nprint(qa(1));\n"
+    assert all(binary.safe for binary in binaries(source))
+
+
+def test_a_def_called_with_a_string_stays_checked():
+    source = """
+def twice(x) {
+  return x + x;
+}
+print(twice(1));
+print(twice("a"));
+"""
+    assert not any(binary.safe for binary in binaries(source))
@@ -0,0 +1,45 @@
+import pytest
+
+from interpreter import parallel
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    monkeypatch.setattr(parallel, "WORKERS", 2)
+
+
+def test_pmap_spreads_over_workers(workers, output):
+    source = """
+def square(x) {
+  return x * x;
+}
+print(pmap(square, [1, 2, 3, 4]));
+"""
+    assert output(source) == "[1, 4, 9, 16]\n"
+
+
+def test_pmap_rejects_global_var_store(workers, output):
+    source = """
+count = 0;
+def bump(x) {
+  count = count + x;
+  return x;
+}
+print(pmap(bump, [1, 1, 1, 1]));
+"""
+    with pytest.raises(RuntimeError, match="can't assign global 'count'"):
+        output(source)
+
+
+def test_single_worker_pmap_runs_in_process(monkeypatch, output):
+    monkeypatch.setattr(parallel, "WORKERS", 1)
+    source = """
+count = 0;
+def bump(x) {
+  count = count + x;
+  return x;
+}
+pmap(bump, [1, 1, 1, 1]);
+print(count);
+"""
+    assert output(source) == "4\n"
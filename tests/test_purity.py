@@ -0,0 +1,14 @@
+import py0
+from interpreter.memo import Memo
+
+
+def test_function_argument_calls_are_not_memoized(capsys):
+    source = """
+def apply(fn, x) {
+  return fn(x);
+}
+apply(print, "side effect");
+apply(print, "side effect");
+"""
+    py0.run(source, memo=Memo())
+    assert capsys.readouterr().out == "side effect\nside effect\n"
@@ -0,0 +1,26 @@
+
+def test_range_prints_like_a_list(output):
+    assert output("print(range(0, 4));") == "[0, 1, 2, 3]\n"
+
+
+def test_range_concatenates_with_lists(output):
+    source = "print(range(0, 3) + [9]);\nprint([9] + range(0, 2));"
+    assert output(source) == "[0, 1, 2, 9]\n[9, 0, 1]\n"
+
+
+def test_storing_into_range_makes_it_a_list(output):
+    source = """
+b = range(0, 3);
+b[0] = 5;
+b[1] = "x";
+print(b);
+for v in b {
+  print(v);
+}
+"""
+    assert output(source) == "[5, 'x', 2]\n5\nx\n2\n"
+
+
+def test_range_repeats_like_a_list(output):
+    source = "print(range(0, 3) * 2);\nprint(2 * range(0, 2));\nprint(range(0, 2) < [0, 5]);"
+    assert output(source) == "[0, 1, 2, 0, 1, 2]\n[0, 1, 0, 1]\nTrue\n"
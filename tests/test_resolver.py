@@ -0,0 +1,66 @@
+
+def test_function_assigns_existing_global(output):
+    source = """
+count = 0;
+def inc() {
+  count = count + 1;
+}
+inc();
+inc();
+print(count);
+"""
+    assert output(source) == "2\n"
+
+
+def test_block_rebinds_native(output):
+    source = """
+def h(x) {
+  return 42;
+}
+if 1 == 1 {
+  len = h;
+}
+print(len([1, 2]));
+"""
+    assert output(source) == "42\n"
+
+
+def test_function_local_stays_local(output):
+    source = """
+def f() {
+  fresh = 5;
+  return fresh;
+}
+print(f());
+fresh = 1;
+print(fresh);
+"""
+    assert output(source) == "5\n1\n"
+
+
+def test_function_local_shadows_native(output):
+    source = """
+def total(xs) {
+  sum = 0;
+  for x in xs {
+    sum = sum + x;
+  }
+  return sum;
+}
+print(total([1, 2]));
+print(sum([1, 2, 3]));
+"""
+    assert output(source) == "3\n6\n"
+
+
+def test_function_assigns_global_that_shadows_native(output):
+    source = """
+max = 0;
+def bump() {
+  max = max + 1;
+}
+bump();
+bump();
+print(max);
+"""
+    assert output(source) == "2\n"
@@ -0,0 +1,68 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import py0
+
+PY0 = os.path.join(os.path.dirname(__file__), os.pardir, "src", "py0.py")
+
+PRELUDE = """
+count = 0;
+def first(a) {
+  return a[0];
+}
+print(first([7, 8]));
+"""
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"),
+                                reason="serving needs fork() and Unix sockets")
+
+
+@pytest.fixture(params=py0.STREAM_ENGINES)
+def server(request, tmp_path):
+    prelude = tmp_path / "prelude.py0"
+    prelude.write_text(PRELUDE)
+    path = str(tmp_path / "py0.sock")
+    process = subprocess.Popen(
+        [sys.executable, PY0, "serve", "--socket", path, "--engine", request.param,
+         "--prelude", str(prelude)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            pytest.fail("the server didn't start")
+        time.sleep(0.05)
+    yield path
+    process.terminate()
+    process.wait()
+
+
+def client(path, source, directory):
+    script = directory / "script.py0"
+    script.write_text(source)
+    return subprocess.run([sys.executable, PY0, "client", "--socket", path, str(script)],
+                          capture_output=True, text=True, timeout=30).stdout
+
+
+def test_scripts_assign_prelude_globals(server, tmp_path):
+    source = """
+def inc() {
+  count = count + 1;
+}
+inc();
+inc();
+print(count);
+"""
+    assert client(server, source, tmp_path) == "2\n"
+    # Every script starts from the prelude's state, not the last script's
+    assert client(server, source, tmp_path) == "2\n"
+
+
+def test_prelude_defs_keep_their_type_checks(server, tmp_path):
+    source = 'print(first("hello"));'
+    assert "Array access on non-array" in client(server, source, tmp_path)